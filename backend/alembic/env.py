@@ -0,0 +1,63 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine
+
+from database.models import Base
+
+# The Alembic Config object, which provides access to the values within alembic.ini
+config = context.config
+
+# Only configure logging when invoked from the command line;
+# when the app runs migrations on startup it keeps its own logging setup.
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+# Table definitions used for 'alembic revision --autogenerate'
+target_metadata = Base.metadata
+
+
+def _get_url() -> str:
+    """Returns the database URL, falling back to the app's configured location."""
+    url = config.get_main_option("sqlalchemy.url")
+    if url:
+        return url
+    from database.database import get_database_url
+    return get_database_url()
+
+
+def run_migrations_offline() -> None:
+    """Run migrations in 'offline' mode (emits SQL to stdout instead of executing it)."""
+    context.configure(
+        url=_get_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=True,  # SQLite needs batch mode for most ALTER TABLE operations
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Run migrations in 'online' mode against a live connection."""
+    # Reuse the application's connection when one is provided (see create_db_and_tables)
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    engine = create_engine(_get_url())
+    with engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+        with context.begin_transaction():
+            context.run_migrations()
+    engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,78 @@
+"""Initial schema: projects, sources, transcriptions, templates
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-11-12
+
+Databases created before migrations were introduced (via Base.metadata.create_all)
+already contain these tables, so each table is only created when missing and the
+indexes use IF NOT EXISTS. This lets existing installs upgrade in place.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    existing_tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "projects" not in existing_tables:
+        op.create_table(
+            "projects",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+
+    if "sources" not in existing_tables:
+        op.create_table(
+            "sources",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id"), nullable=False),
+            sa.Column("file_path", sa.String(), nullable=False, unique=True),
+            sa.Column("url", sa.String(), nullable=True, unique=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+
+    if "transcriptions" not in existing_tables:
+        op.create_table(
+            "transcriptions",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("source_id", sa.Integer(), sa.ForeignKey("sources.id"), nullable=False),
+            sa.Column("full_text", sa.Text(), nullable=False),
+            sa.Column("language", sa.String(), nullable=True),
+        )
+
+    if "templates" not in existing_tables:
+        op.create_table(
+            "templates",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(), nullable=False),
+            sa.Column("prompt_text", sa.Text(), nullable=False),
+            sa.Column("language", sa.String(), nullable=False, server_default="English"),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+
+    op.create_index("ix_projects_id", "projects", ["id"], if_not_exists=True)
+    op.create_index("ix_projects_name", "projects", ["name"], if_not_exists=True)
+    op.create_index("ix_sources_id", "sources", ["id"], if_not_exists=True)
+    op.create_index("ix_sources_project_id", "sources", ["project_id"], if_not_exists=True)
+    op.create_index("ix_sources_project_created", "sources", ["project_id", "created_at"], if_not_exists=True)
+    op.create_index("ix_transcriptions_id", "transcriptions", ["id"], if_not_exists=True)
+    op.create_index("ix_transcriptions_source_id", "transcriptions", ["source_id"], unique=True, if_not_exists=True)
+    op.create_index("ix_templates_id", "templates", ["id"], if_not_exists=True)
+    op.create_index("ix_templates_name", "templates", ["name"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_table("transcriptions")
+    op.drop_table("sources")
+    op.drop_table("templates")
+    op.drop_table("projects")
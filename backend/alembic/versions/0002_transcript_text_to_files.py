@@ -0,0 +1,58 @@
+"""Move transcriptions.full_text into files referenced by full_text_path
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-11-12
+
+Each existing transcript is written to <data_storage_path>/transcripts/<source_id>.txt
+and the inline full_text column is dropped.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    from services.transcript_file_service import save_transcript_text
+
+    bind = op.get_bind()
+    columns = {c["name"] for c in sa.inspect(bind).get_columns("transcriptions")}
+
+    if "full_text_path" not in columns:
+        op.add_column("transcriptions", sa.Column("full_text_path", sa.String(), nullable=True))
+
+    if "full_text" in columns:
+        rows = bind.execute(sa.text("SELECT id, source_id, full_text FROM transcriptions")).fetchall()
+        updates = [
+            {"id": row.id, "path": save_transcript_text(row.source_id, row.full_text or "")}
+            for row in rows
+        ]
+        if updates:
+            bind.execute(sa.text("UPDATE transcriptions SET full_text_path = :path WHERE id = :id"), updates)
+
+        with op.batch_alter_table("transcriptions") as batch_op:
+            batch_op.drop_column("full_text")
+            batch_op.alter_column("full_text_path", existing_type=sa.String(), nullable=False)
+
+
+def downgrade() -> None:
+    from services.transcript_file_service import read_transcript_text
+
+    bind = op.get_bind()
+    op.add_column("transcriptions", sa.Column("full_text", sa.Text(), nullable=True))
+
+    rows = bind.execute(sa.text("SELECT id, full_text_path FROM transcriptions")).fetchall()
+    updates = [{"id": row.id, "text": read_transcript_text(row.full_text_path)} for row in rows]
+    if updates:
+        bind.execute(sa.text("UPDATE transcriptions SET full_text = :text WHERE id = :id"), updates)
+
+    with op.batch_alter_table("transcriptions") as batch_op:
+        batch_op.drop_column("full_text_path")
+        batch_op.alter_column("full_text", existing_type=sa.Text(), nullable=False)
@@ -0,0 +1,52 @@
+"""Replace the UNIQUE constraint on sources.url with a partial unique index
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-11-12
+
+SQLite cannot drop a column-level UNIQUE constraint in place, so the sources table is
+rebuilt (batch mode) from an explicit definition without it.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _sources_table(url_unique: bool) -> sa.Table:
+    metadata = sa.MetaData()
+    # Minimal definition so the foreign key below can be compiled
+    sa.Table("projects", metadata, sa.Column("id", sa.Integer(), primary_key=True))
+    return sa.Table(
+        "sources",
+        metadata,
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("project_id", sa.Integer(), sa.ForeignKey("projects.id"), nullable=False),
+        sa.Column("file_path", sa.String(), nullable=False, unique=True),
+        sa.Column("url", sa.String(), nullable=True, unique=url_unique),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Index("ix_sources_id", "id"),
+        sa.Index("ix_sources_project_id", "project_id"),
+        sa.Index("ix_sources_project_created", "project_id", "created_at"),
+    )
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("sources", copy_from=_sources_table(url_unique=False), recreate="always"):
+        pass
+    op.create_index(
+        "ux_sources_url", "sources", ["url"],
+        unique=True, sqlite_where=sa.text("url IS NOT NULL"), if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ux_sources_url", table_name="sources", if_exists=True)
+    with op.batch_alter_table("sources", copy_from=_sources_table(url_unique=True), recreate="always"):
+        pass
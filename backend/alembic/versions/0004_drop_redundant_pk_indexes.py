@@ -0,0 +1,30 @@
+"""Drop the redundant indexes on INTEGER PRIMARY KEY columns
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-11-12
+
+An INTEGER PRIMARY KEY is an alias for SQLite's rowid, which already keys the table's
+B-tree, so the separate ix_<table>_id indexes only cost writes and space.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ("projects", "sources", "transcriptions", "templates")
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.drop_index(f"ix_{table}_id", table_name=table, if_exists=True)
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.create_index(f"ix_{table}_id", table, ["id"], if_not_exists=True)
@@ -0,0 +1,29 @@
+"""Add transcriptions.detected_language
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-11-12
+
+Existing rows are left NULL; the API detects their language on demand.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("transcriptions")}
+    if "detected_language" not in columns:
+        op.add_column("transcriptions", sa.Column("detected_language", sa.String(16), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("transcriptions") as batch_op:
+        batch_op.drop_column("detected_language")
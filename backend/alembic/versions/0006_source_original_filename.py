@@ -0,0 +1,40 @@
+"""Add sources.original_filename and backfill it from file_path
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2025-11-12
+
+Stored paths look like ".../<uuid>_<original filename>"; the part after the first
+underscore of the basename is the original filename.
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    columns = {c["name"] for c in sa.inspect(bind).get_columns("sources")}
+    if "original_filename" not in columns:
+        op.add_column("sources", sa.Column("original_filename", sa.String(), nullable=True))
+
+    rows = bind.execute(sa.text("SELECT id, file_path FROM sources WHERE original_filename IS NULL")).fetchall()
+    updates = []
+    for row in rows:
+        basename = os.path.basename(row.file_path)
+        updates.append({"id": row.id, "name": basename.split('_', 1)[1] if '_' in basename else basename})
+    if updates:
+        bind.execute(sa.text("UPDATE sources SET original_filename = :name WHERE id = :id"), updates)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("sources") as batch_op:
+        batch_op.drop_column("original_filename")
@@ -1,38 +1,299 @@
+import functools
+import logging
 import os
-from sqlalchemy import create_engine
+import sys
+import threading
+from pathlib import Path
+
+# Prefer the statically linked, up-to-date SQLite from pysqlite3-binary when it is installed
+# (newer query planner and pragmas than the SQLite bundled with many Python builds).
+# SQLAlchemy's pysqlite dialect imports "sqlite3" lazily, so swapping the module here,
+# before any engine is created, is enough. Falls back to the standard library elsewhere
+# (pysqlite3-binary only ships Linux wheels).
+try:
+    import pysqlite3
+    sys.modules["sqlite3"] = pysqlite3
+except ImportError:
+    pass
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from .models import Base
 from services.config_service import load_config # Imports the function to load our app's configuration
 
-# Load the application configuration to get the user-defined data storage path
-config = load_config()
-DATA_STORAGE_PATH = config.get("data_storage_path", ".") # Defaults to the current directory if not found
+logger = logging.getLogger(__name__)
+
+# Engines, URLs and session factories are built lazily on first use rather than at import time,
+# so importing this module (e.g. from tests or tooling) does not touch the config file or the database.
+
+@functools.lru_cache(maxsize=1)
+def get_database_file_path() -> str:
+    """Returns the path of the SQLite file inside the user-defined data storage path."""
+    config = load_config()
+    data_storage_path = config.get("data_storage_path", ".") # Defaults to the current directory if not found
+    return os.path.join(data_storage_path, 'insightslm.db')
 
-# The database URL is now dynamically created inside the configured data storage path
-DATABASE_URL = f"sqlite:///{os.path.join(DATA_STORAGE_PATH, 'insightslm.db')}"
+def get_database_url() -> str:
+    """Writer URL: a plain file URL, used for all inserts/updates/deletes and schema creation."""
+    return f"sqlite:///{get_database_file_path()}"
+
+def get_read_database_url() -> str:
+    """
+    Reader URL: opens the same file through an SQLite URI in read-only mode.
+    Each reader keeps a private page cache (no cache=shared): a shared cache would serialize
+    the pooled WAL readers on one mutex. Pooling keeps those caches warm between requests.
+    Path.as_uri() produces a valid file: URI on every platform (including Windows drive letters).
+    """
+    return f"sqlite:///{Path(get_database_file_path()).resolve().as_uri()}?mode=ro&uri=true"
 
-# Create the SQLAlchemy engine, which manages connections to the database.
+def _is_file_database(url: str) -> bool:
+    return url.startswith("sqlite:") and ":memory:" not in url
+
+# Configure every new SQLite connection for concurrent access.
+# WAL lets readers proceed while a writer (e.g. a transcription insert) is in flight,
+# and busy_timeout makes transient lock contention wait instead of raising "database is locked".
+def _set_sqlite_pragma(dbapi_conn, _):
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL")
+    cur.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL, avoids an fsync per commit
+    cur.execute("PRAGMA busy_timeout=5000")   # Milliseconds
+    cur.execute("PRAGMA temp_store=MEMORY")
+    cur.execute("PRAGMA cache_size=-64000")   # Negative value = size in KiB (~64 MB)
+    cur.execute("PRAGMA mmap_size=268435456") # Memory-map up to 256 MB of the file to cut read syscalls
+    # Raise the automatic checkpoint threshold (pages) so commits rarely pay for a checkpoint;
+    # the background thread below does the regular checkpointing instead.
+    cur.execute("PRAGMA wal_autocheckpoint=10000")
+    cur.close()
+
+# journal_mode is persistent in the file (set by the writer), and a read-only
+# connection cannot change it, so readers only get the per-connection settings.
+def _set_sqlite_read_pragma(dbapi_conn, _):
+    cur = dbapi_conn.cursor()
+    cur.execute("PRAGMA busy_timeout=5000")
+    cur.execute("PRAGMA temp_store=MEMORY")
+    cur.execute("PRAGMA cache_size=-64000")
+    cur.execute("PRAGMA mmap_size=268435456")
+    cur.close()
+
+# Size of SQLAlchemy's per-engine compiled statement cache (default 500). The app only has a
+# few dozen distinct statements, but ORM loader variants multiply them; a larger cache keeps
+# every one of them compiled once for the life of the process.
+QUERY_CACHE_SIZE = 1200
+
+# Create the SQLAlchemy engines, which manage connections to the database.
 # The 'connect_args' is needed specifically for SQLite to allow it to be used by multiple threads, as FastAPI runs.
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# An explicit QueuePool keeps connections (and their SQLite page cache) alive across requests
+# instead of opening and configuring a fresh connection on every endpoint call.
+
+@functools.lru_cache(maxsize=1)
+def get_write_engine():
+    """
+    SQLite only ever allows a single writer, so the write engine holds exactly one connection:
+    concurrent writers queue in the pool instead of colliding on the file lock (SQLITE_BUSY).
+    """
+    url = get_database_url()
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=30,
+        pool_recycle=1800,
+        pool_pre_ping=True,
+        query_cache_size=QUERY_CACHE_SIZE
+    )
+    if _is_file_database(url):
+        event.listen(engine, "connect", _set_sqlite_pragma)
+    return engine
+
+@functools.lru_cache(maxsize=1)
+def get_read_engine():
+    """
+    Readers never take the write lock, so with WAL they scale with the number of connections
+    and are not blocked by a long write transaction (e.g. storing a full transcription).
+    """
+    url = get_read_database_url()
+    engine = create_engine(
+        url,
+        connect_args={"uri": True, "check_same_thread": False},
+        poolclass=QueuePool,
+        pool_size=8,
+        max_overflow=10,
+        pool_timeout=30,
+        pool_recycle=1800,
+        pool_pre_ping=True,
+        query_cache_size=QUERY_CACHE_SIZE
+    )
+    if _is_file_database(url):
+        event.listen(engine, "connect", _set_sqlite_read_pragma)
+    return engine
+
+# Backward-compatible alias: the default engine is the writer
+get_engine = get_write_engine
+
+@functools.lru_cache(maxsize=1)
+def get_async_read_engine():
+    """
+    Async read-only engine (aiosqlite driver) for endpoints that only query the database.
+    Lets those endpoints run directly on the event loop instead of hopping to FastAPI's
+    threadpool; the pool keeps configured connections warm between requests.
+    """
+    read_url = get_read_database_url()
+    url = read_url.replace("sqlite:///", "sqlite+aiosqlite:///", 1)
+    engine = create_async_engine(
+        url,
+        connect_args={"uri": True},
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=5,
+        max_overflow=10,
+        pool_recycle=1800,
+        pool_pre_ping=True,
+        query_cache_size=QUERY_CACHE_SIZE
+    )
+    # Checked on the sqlite:// URL (before the driver rewrite), which _is_file_database() expects
+    if _is_file_database(read_url):
+        # PRAGMAs are applied through the sync facade of the aiosqlite connection
+        event.listen(engine.sync_engine, "connect", _set_sqlite_read_pragma)
+    return engine
+
+# Session factories (i.e., conversations with the DB), one per engine.
+@functools.lru_cache(maxsize=1)
+def _write_sessionmaker():
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_write_engine())
+
+@functools.lru_cache(maxsize=1)
+def _read_sessionmaker():
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_read_engine())
+
+@functools.lru_cache(maxsize=1)
+def _async_read_sessionmaker():
+    return async_sessionmaker(bind=get_async_read_engine(), autoflush=False, expire_on_commit=False)
+
+def new_write_session():
+    """Opens a new session bound to the writer engine."""
+    return _write_sessionmaker()()
 
-# A SessionLocal class serves as a factory for new database sessions (i.e., conversations with the DB).
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def new_read_session():
+    """Opens a new session bound to the read-only engine."""
+    return _read_sessionmaker()()
+
+# Backward-compatible alias: SessionLocal() still returns a writer session
+SessionLocal = new_write_session
+
+# --- Background WAL Checkpointing ---
+
+# Seconds between passive checkpoints
+WAL_CHECKPOINT_INTERVAL = 30
+
+_checkpoint_thread = None
+_checkpoint_stop = threading.Event()
+
+def _checkpoint_loop():
+    """Periodically copies WAL frames back into the database file without blocking readers or writers."""
+    while not _checkpoint_stop.wait(WAL_CHECKPOINT_INTERVAL):
+        try:
+            with get_write_engine().connect() as connection:
+                connection.exec_driver_sql("PRAGMA wal_checkpoint(PASSIVE)")
+        except Exception:
+            logger.warning("WAL checkpoint failed", exc_info=True)
+
+def start_wal_checkpoint_thread():
+    """
+    Starts the background checkpoint thread (once per process).
+    Keeps checkpoint work off the request path so an occasional COMMIT
+    does not stall while the WAL is folded back into the main file.
+    """
+    global _checkpoint_thread
+    if _checkpoint_thread is not None or not _is_file_database(get_database_url()):
+        return
+    _checkpoint_stop.clear()
+    _checkpoint_thread = threading.Thread(target=_checkpoint_loop, name="sqlite-wal-checkpoint", daemon=True)
+    _checkpoint_thread.start()
+
+def stop_wal_checkpoint_thread():
+    """Stops the background checkpoint thread, if running."""
+    global _checkpoint_thread
+    if _checkpoint_thread is None:
+        return
+    _checkpoint_stop.set()
+    _checkpoint_thread.join(timeout=5)
+    _checkpoint_thread = None
+
+# Location of the Alembic migration environment (backend/alembic.ini and backend/alembic/)
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Set INSIGHTSLM_DB_CREATE_ALL=1 for tests / throwaway databases to skip Alembic
+# and build the schema directly from the models.
+CREATE_ALL_ON_STARTUP = os.environ.get("INSIGHTSLM_DB_CREATE_ALL", "") == "1"
+
+def run_migrations():
+    """
+    Upgrades the database schema to the latest Alembic revision ("head").
+    Runs on the writer connection so the configured PRAGMAs apply.
+    """
+    from alembic import command
+    from alembic.config import Config
+
+    alembic_cfg = Config(str(BACKEND_DIR / "alembic.ini"))
+    alembic_cfg.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    alembic_cfg.attributes["configure_logger"] = False  # Keep the app's logging setup
+    with get_write_engine().begin() as connection:
+        alembic_cfg.attributes["connection"] = connection
+        command.upgrade(alembic_cfg, "head")
 
 def create_db_and_tables():
     """
-    Creates the database file and all tables defined in models.py if they don't already exist.
+    Creates the database file and brings its schema up to date.
+    Uses Alembic migrations by default; builds tables straight from models.py when
+    INSIGHTSLM_DB_CREATE_ALL=1 (tests / in-memory databases).
+    """
+    if CREATE_ALL_ON_STARTUP:
+        # Base.metadata contains all the table definitions.
+        Base.metadata.create_all(bind=get_write_engine())
+    else:
+        run_migrations()
+
+def get_db_rw():
+    """
+    A dependency for FastAPI endpoints that write to the database.
+    Provides a session bound to the single-connection writer engine and ensures it's closed afterward.
     """
-    # Base.metadata contains all the table definitions.
-    Base.metadata.create_all(bind=engine)
+    db = new_write_session()
+    try:
+        yield db
+    finally:
+        # Drop identity-map references before returning the connection to the pool,
+        # so long-lived workers don't keep ORM objects from finished requests alive
+        db.expunge_all()
+        db.close()
 
-def get_db():
+def get_db_ro():
     """
-    A dependency for FastAPI endpoints that provides a database session and ensures it's closed afterward.
+    A dependency for FastAPI endpoints that only read from the database.
+    Provides a session bound to the read-only engine and ensures it's closed afterward.
     """
-    db = SessionLocal()
+    db = new_read_session()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        # Drop identity-map references before returning the connection to the pool,
+        # so long-lived workers don't keep ORM objects from finished requests alive
+        db.expunge_all()
+        db.close()
+
+async def get_async_db_ro():
+    """
+    An async dependency for `async def` endpoints that only read from the database.
+    Provides an AsyncSession bound to the async read-only engine and closes it afterward.
+    """
+    async with _async_read_sessionmaker()() as db:
+        try:
+            yield db
+        finally:
+            db.expunge_all()
+
+# Backward-compatible alias: the default dependency is the writer
+get_db = get_db_rw
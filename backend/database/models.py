@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Index, text
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy.sql import func
 
@@ -6,32 +6,59 @@ Base = declarative_base()
 
 class Project(Base):
     __tablename__ = "projects"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     sources = relationship("Source", back_populates="project")
 
 class Source(Base):
     __tablename__ = "sources"
-    id = Column(Integer, primary_key=True, index=True)
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False)
+    id = Column(Integer, primary_key=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=False, index=True)
     file_path = Column(String, unique=True, nullable=False)
-    url = Column(String, unique=True, nullable=True)
+    # Filename as uploaded/downloaded (file_path is prefixed with a UUID), stored for listings
+    original_filename = Column(String, nullable=True)
+    # Unique only when present; enforced by the partial index "ux_sources_url" below,
+    # so file-only sources (url IS NULL) skip the uniqueness probe entirely
+    url = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     project = relationship("Project", back_populates="sources")
-    transcription = relationship("Transcription", back_populates="source", uselist=False)
+    # One-to-one: loaded in the same SELECT (LEFT OUTER JOIN) to avoid an extra query per source.
+    # The transcription row is small since its text lives on disk.
+    transcription = relationship("Transcription", back_populates="source", uselist=False, lazy="joined")
+
+    __table_args__ = (
+        # Covers the "latest sources per project" lookup as an index-only scan
+        Index("ix_sources_project_created", "project_id", "created_at"),
+        Index("ux_sources_url", "url", unique=True, sqlite_where=text("url IS NOT NULL")),
+    )
 
 class Transcription(Base):
     __tablename__ = "transcriptions"
-    id = Column(Integer, primary_key=True, index=True)
-    source_id = Column(Integer, ForeignKey("sources.id"), nullable=False)
-    full_text = Column(Text, nullable=False)
+    id = Column(Integer, primary_key=True)
+    # Unique: each source has exactly one transcription (Source.transcription is uselist=False)
+    source_id = Column(Integer, ForeignKey("sources.id"), nullable=False, index=True, unique=True)
+    # The transcript text itself lives in a file (see services/transcript_file_service.py);
+    # only its path is stored here so the row stays small.
+    full_text_path = Column(String, nullable=False)
     language = Column(String, nullable=True)
+    # Language name for LLM prompts (e.g. "Spanish"), detected once when the transcription is stored
+    detected_language = Column(String(16), nullable=True, default="English")
     source = relationship("Source", back_populates="transcription")
 
+    @property
+    def full_text(self) -> str:
+        """Reads the transcript text from its file on first access and keeps it on the instance."""
+        cached = self.__dict__.get("_full_text")
+        if cached is None:
+            with open(self.full_text_path, "r", encoding="utf-8") as f:
+                cached = f.read()
+            self.__dict__["_full_text"] = cached
+        return cached
+
 class Template(Base):
     __tablename__ = "templates"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False, index=True)
     prompt_text = Column(Text, nullable=False)
     language = Column(String, nullable=False, server_default="English")
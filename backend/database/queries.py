@@ -0,0 +1,18 @@
+from sqlalchemy import bindparam, select
+from .models import Source, Template, Transcription
+
+# Hot statements built once at import time with bind parameters, so every request reuses
+# the same statement object and hits SQLAlchemy's compiled cache instead of rebuilding it.
+# Usage: db.execute(STATEMENT, {"param": value})
+
+# A source by primary key (its transcription is joined in by the relationship's lazy="joined")
+SOURCE_BY_ID = select(Source).where(Source.id == bindparam("source_id"))
+
+# The transcription of a source (served by the unique ix_transcriptions_source_id)
+TRANSCRIPTION_BY_SOURCE = (
+    select(Transcription)
+    .where(Transcription.source_id == bindparam("source_id"))
+)
+
+# A template by primary key (for writes; reads go through database.template_cache)
+TEMPLATE_BY_ID = select(Template).where(Template.id == bindparam("template_id"))
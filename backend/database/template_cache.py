@@ -0,0 +1,31 @@
+import functools
+from typing import NamedTuple, Optional
+from .database import new_read_session
+from .models import Template
+
+# Templates are small and read-mostly, while every report generation needs one.
+# Keep them in a process-local LRU cache so the steady-state read path skips SQLite entirely.
+# Every write path (create/update/delete template) must call invalidate_template_cache().
+
+
+class CachedTemplate(NamedTuple):
+    """Immutable snapshot of a Template row (safe to share between requests, unlike ORM objects)."""
+    id: int
+    name: str
+    prompt_text: str
+    language: str
+
+
+@functools.lru_cache(maxsize=256)
+def get_template_cached(template_id: int) -> Optional[CachedTemplate]:
+    """Returns the template with the given id, or None if it does not exist."""
+    with new_read_session() as db:
+        template = db.get(Template, template_id)
+        if template is None:
+            return None
+        return CachedTemplate(template.id, template.name, template.prompt_text, template.language)
+
+
+def invalidate_template_cache() -> None:
+    """Clears all cached templates. Call after any template write."""
+    get_template_cached.cache_clear()
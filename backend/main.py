@@ -1,40 +1,59 @@
+import asyncio
+import functools
 import os
 import shutil
 import uuid
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
 import logging  # STEP 6B: Added for enhanced error logging
-from fastapi import FastAPI, UploadFile, File, Depends, HTTPException, Response
+import aiofiles
+import ahocorasick
+from fastapi import FastAPI, UploadFile, File, Depends, HTTPException, Request, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse  # REQUIREMENT 5.4: Added for API testing responses
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse  # REQUIREMENT 5.4: Added for API testing responses
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List, Dict
+from typing import Iterable, List
 
 # STEP 6B: Set up logging for error tracking
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+# Config endpoint logging; set this logger to DEBUG to trace /config/ updates (keys are masked)
+config_logger = logging.getLogger("insightslm.config")
 
 # Local imports from our application's modules
-from database.database import create_db_and_tables, get_db
+from database.database import (
+    create_db_and_tables, get_db, get_db_ro, get_async_db_ro, new_write_session,
+    start_wal_checkpoint_thread, stop_wal_checkpoint_thread
+)
 from database.models import Project, Source, Transcription, Template
+from database.queries import SOURCE_BY_ID, TEMPLATE_BY_ID, TRANSCRIPTION_BY_SOURCE
+from database.template_cache import CachedTemplate, get_template_cached, invalidate_template_cache
 from services.transcription_service import transcribe_audio
-from services.vector_db_service import add_transcript_to_db, query_db
+from services.vector_db_service import enqueue_transcript, query_db, start_ingest_worker, stop_ingest_worker
 from services.llm_service import (
     generate_response, 
+    generate_response_async,  # Awaited provider calls for async endpoints
+    generate_response_stream,  # Token streaming for /query/stream/
     test_api_connection,  # REQUIREMENT 5.4: API testing
-    get_ollama_models,    # STEP 2: Model discovery
-    get_openai_models,    # STEP 2: Model discovery
-    get_anthropic_models, # STEP 2: Model discovery
-    get_google_models,    # STEP 2: Model discovery
-    get_all_available_models  # STEP 2: Model discovery
+    test_all_connections,  # Concurrent test of every provider
+    get_cached_models,    # STEP 2: Model discovery (per-provider, TTL cached)
+    get_all_available_models_async  # STEP 2: Model discovery
 )
 from services.downloader_service import download_audio
+from services.transcript_file_service import save_transcript_text, iter_transcript_text
 from services.tts_service import generate_audio
 from services import export_service
 from schemas import (
     QueryRequest, UrlRequest, SummarizeRequest, TemplateCreate,
-    TemplateUpdate, TemplateResponse, ReportRequest, ExportRequest
+    TemplateUpdate, TemplateResponse, ReportRequest, ExportRequest,
+    ConfigResponse, ConfigUpdate, ConfigPatch, ContentType, ExportFormat
 )
-from services.config_service import load_config, save_config, encrypt_key, decrypt_key
+from services.config_service import load_config, save_config, encrypt_keys, decrypt_keys, get_config_etag, API_KEY_PROVIDERS
 
 # --- Configuration & Directory Setup ---
 # Load configuration and define all data paths based on it
@@ -45,47 +64,102 @@ STATIC_DIRECTORY = os.path.join(DATA_STORAGE_PATH, "static")
 AUDIO_OVERVIEW_DIRECTORY = os.path.join(STATIC_DIRECTORY, "audio_overviews")
 os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
 os.makedirs(AUDIO_OVERVIEW_DIRECTORY, exist_ok=True)
+# Directory prefixes with a trailing platform separator, so per-request paths are plain
+# string concatenation instead of os.path.join (still correct on Windows)
+UPLOAD_PATH_PREFIX = os.path.join(UPLOAD_DIRECTORY, "")
+AUDIO_OVERVIEW_PATH_PREFIX = os.path.join(AUDIO_OVERVIEW_DIRECTORY, "")
+
+# Heavy ML inference (Whisper transcription, TTS) runs on this dedicated executor instead of
+# the request threadpool. One worker by default so concurrent requests queue up rather than
+# loading several models onto the same GPU; raise INSIGHTSLM_INFERENCE_WORKERS for more devices.
+INFERENCE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("INSIGHTSLM_INFERENCE_WORKERS", "1")),
+    thread_name_prefix="inference"
+)
+
+async def run_inference(func, *args):
+    """Runs a blocking inference-bound call on INFERENCE_EXECUTOR without blocking the event loop."""
+    return await asyncio.wrap_future(INFERENCE_EXECUTOR.submit(func, *args))
 
 
 # --- Language Detection Helper ---
+
+# Language-specific indicator words (trailing space marks the end of a word)
+LANGUAGE_INDICATORS = {
+    'Spanish': ['el ', 'la ', 'los ', 'las ', 'de ', 'que ', 'es ', 'un ', 'una ', 'por ', 'para ', 'con ', 'en ', 'del '],
+    'French': ['le ', 'la ', 'les ', 'de ', 'des ', 'un ', 'une ', 'je ', 'tu ', 'il ', 'nous ', 'vous ', 'ils ', 'et ', 'est ', 'dans '],
+    'German': ['der ', 'die ', 'das ', 'den ', 'dem ', 'des ', 'ein ', 'eine ', 'und ', 'ich ', 'ist ', 'nicht ', 'mit ', 'für '],
+    'English': ['the ', 'a ', 'an ', 'is ', 'are ', 'was ', 'were ', 'and ', 'or ', 'but ', 'in ', 'on ', 'at ', 'to ', 'for '],
+}
+
+def _build_language_automaton() -> ahocorasick.Automaton:
+    """
+    Builds an Aho-Corasick automaton over all indicator words, so a single pass over the
+    sample finds every indicator instead of one str.count() scan per indicator.
+    Each word maps to the tuple of languages it counts towards (e.g. 'la ' -> Spanish, French).
+    """
+    word_languages = {}
+    for language, indicators in LANGUAGE_INDICATORS.items():
+        for indicator in indicators:
+            word_languages.setdefault(indicator, []).append(language)
+
+    automaton = ahocorasick.Automaton()
+    for word, languages in word_languages.items():
+        automaton.add_word(word, tuple(languages))
+    automaton.make_automaton()
+    return automaton
+
+LANGUAGE_AUTOMATON = _build_language_automaton()
+
+# Number of leading characters scored by detect_language. The automaton scan is a single
+# linear pass in C, so this can be raised for better accuracy without changing the algorithm.
+LANGUAGE_SAMPLE_CHARS = 500
+
 def detect_language(text: str) -> str:
     """
     Detect the primary language of the text using simple heuristics.
     Returns a language name suitable for LLM prompts.
     """
-    # Take first 500 characters for detection
-    sample = text[:500].lower()
-
-    # Count language-specific indicators
-    spanish_indicators = ['el ', 'la ', 'los ', 'las ', 'de ', 'que ', 'es ', 'un ', 'una ', 'por ', 'para ', 'con ', 'en ', 'del ']
-    french_indicators = ['le ', 'la ', 'les ', 'de ', 'des ', 'un ', 'une ', 'je ', 'tu ', 'il ', 'nous ', 'vous ', 'ils ', 'et ', 'est ', 'dans ']
-    german_indicators = ['der ', 'die ', 'das ', 'den ', 'dem ', 'des ', 'ein ', 'eine ', 'und ', 'ich ', 'ist ', 'nicht ', 'mit ', 'für ']
-    english_indicators = ['the ', 'a ', 'an ', 'is ', 'are ', 'was ', 'were ', 'and ', 'or ', 'but ', 'in ', 'on ', 'at ', 'to ', 'for ']
-
-    spanish_count = sum(sample.count(indicator) for indicator in spanish_indicators)
-    french_count = sum(sample.count(indicator) for indicator in french_indicators)
-    german_count = sum(sample.count(indicator) for indicator in german_indicators)
-    english_count = sum(sample.count(indicator) for indicator in english_indicators)
+    # Take the first LANGUAGE_SAMPLE_CHARS characters for detection.
+    # Transcriptions never change once stored, so results are memoized by this sample.
+    return _detect_language_cached(text[:LANGUAGE_SAMPLE_CHARS].lower())
+
+@functools.lru_cache(maxsize=1024)
+def _detect_language_cached(sample: str) -> str:
+    """Scores an already-lowercased sample (see detect_language)."""
+    # Count language-specific indicators in one pass over the sample.
+    # Indicators only contain a single (trailing) space, so matches of the same word never
+    # overlap and the totals equal the previous per-indicator str.count() results.
+    counts = dict.fromkeys(LANGUAGE_INDICATORS, 0)
+    for _, languages in LANGUAGE_AUTOMATON.iter(sample):
+        for language in languages:
+            counts[language] += 1
 
     # Determine which language has the most indicators
-    counts = {
-        'Spanish': spanish_count,
-        'French': french_count,
-        'German': german_count,
-        'English': english_count
-    }
-
     detected_language = max(counts, key=counts.get)
 
     # Require minimum threshold to avoid false positives
     if counts[detected_language] < 3:
         detected_language = 'English'  # Default to English if uncertain
 
-    print(f"Language detection: {detected_language} (scores: {counts})")
+    # Lazy %-formatting: the counts dict is only rendered when DEBUG logging is enabled
+    logger.debug("Language detection: %s (scores: %s)", detected_language, counts)
     return detected_language
 
 
+def get_transcription_language(transcription: Transcription) -> str:
+    """
+    Returns the language stored on the transcription at ingest time.
+    Falls back to detecting it for transcriptions created before the column existed.
+    """
+    return transcription.detected_language or detect_language(transcription.full_text)
+
+
 # REQUIREMENT 3: Audio Filename Sanitization Helper
+# Translation table deleting the characters stripped from audio overview names
+_AUDIO_NAME_DROP = str.maketrans('', '', ' -_()')
+
+
 def sanitize_filename_for_audio(file_path: str) -> str:
     """
     REQUIREMENT 3: Extract and sanitize filename from Source.file_path for audio overview naming.
@@ -107,48 +181,20 @@ def sanitize_filename_for_audio(file_path: str) -> str:
         # Extract filename from full path
         filename_with_ext = os.path.basename(file_path)
 
-        # Extract original filename after the UUID (after last underscore)
-        if '_' in filename_with_ext:
-            # Split by underscore and take everything after the first part (UUID)
-            parts = filename_with_ext.split('_', 1)
-            if len(parts) > 1:
-                original_filename = parts[1]
-            else:
-                original_filename = filename_with_ext
-        else:
-            original_filename = filename_with_ext
+        # Extract original filename after the UUID (after first underscore)
+        original_filename = filename_with_ext.split('_', 1)[-1]
 
         # Remove file extension
         name_without_ext = os.path.splitext(original_filename)[0]
-
-        # Apply sanitization rules
-        sanitized = name_without_ext
-
-        # Remove spaces
-        sanitized = sanitized.replace(' ', '')
-
-        # Remove hyphens
-        sanitized = sanitized.replace('-', '')
-
-        # Remove underscores
-        sanitized = sanitized.replace('_', '')
-
-        # Remove parentheses
-        sanitized = sanitized.replace('(', '').replace(')', '')
-
-        # Preserve original case, truncate to max 30 characters
-        sanitized = sanitized[:30]
-
-        # Fallback to "Audio" if result is empty
-        if not sanitized:
-            sanitized = "Audio"
-
-        return sanitized
-
     except Exception as e:
-        print(f"Error sanitizing filename from {file_path}: {e}")
+        logger.warning("Error sanitizing filename from %s: %s", file_path, e)
         return "Audio"  # Safe fallback
 
+    # Strip spaces, hyphens, underscores and parentheses in a single pass,
+    # preserve original case, truncate to max 30 characters,
+    # and fall back to "Audio" if the result is empty
+    return name_without_ext.translate(_AUDIO_NAME_DROP)[:30] or "Audio"
+
 
 def extract_original_filename(file_path: str) -> str:
     """
@@ -173,7 +219,7 @@ def extract_original_filename(file_path: str) -> str:
         return filename_with_ext
 
     except Exception as e:
-        print(f"Error extracting filename from {file_path}: {e}")
+        logger.warning("Error extracting filename from %s: %s", file_path, e)
         return os.path.basename(file_path)
 
 
@@ -183,14 +229,52 @@ def extract_original_filename(file_path: str) -> str:
 async def startup_event():
     print("Starting up...")
     create_db_and_tables()
-    db = next(get_db())
-    if not db.query(Project).filter(Project.id == 1).first():
-        db.add(Project(id=1, name="Default Project"))
+    with new_write_session() as db:
+        # Single INSERT OR IGNORE instead of SELECT + INSERT: a no-op on warm starts
+        db.execute(
+            sqlite_insert(Project)
+            .values(id=1, name="Default Project")
+            .on_conflict_do_nothing(index_elements=["id"])
+        )
         db.commit()
-    db.close()
+    start_wal_checkpoint_thread()
+    start_ingest_worker()
     print("Startup complete. Default project created.")
 
-app = FastAPI(title="InsightsLM Backend", on_startup=[startup_event])
+# This function runs once when the application shuts down
+async def shutdown_event():
+    stop_wal_checkpoint_thread()
+    stop_ingest_worker()
+    INFERENCE_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+
+# orjson (C) serializes responses such as /models/all and /sources/ much faster than the stdlib json
+app = FastAPI(
+    title="InsightsLM Backend",
+    on_startup=[startup_event],
+    on_shutdown=[shutdown_event],
+    default_response_class=ORJSONResponse
+)
+
+# When deployed behind nginx, set INSIGHTSLM_AUDIO_ACCEL_REDIRECT to an "internal;" location
+# aliased to AUDIO_OVERVIEW_DIRECTORY (e.g. "/_audio/") and nginx serves the bytes itself (zero-copy)
+AUDIO_ACCEL_REDIRECT_PREFIX = os.environ.get("INSIGHTSLM_AUDIO_ACCEL_REDIRECT")
+
+# Registered before the /static mount so it takes precedence for audio overviews
+@app.get("/static/audio_overviews/{audio_filename}", summary="Serve a generated audio overview")
+def get_audio_overview(audio_filename: str):
+    # Only bare filenames inside AUDIO_OVERVIEW_DIRECTORY
+    if audio_filename != os.path.basename(audio_filename) or audio_filename.startswith("."):
+        raise HTTPException(status_code=404, detail="Audio overview not found.")
+    if AUDIO_ACCEL_REDIRECT_PREFIX:
+        return Response(
+            media_type="audio/mpeg",
+            headers={"X-Accel-Redirect": f"{AUDIO_ACCEL_REDIRECT_PREFIX}{audio_filename}"}
+        )
+    audio_path = AUDIO_OVERVIEW_PATH_PREFIX + audio_filename
+    if not os.path.isfile(audio_path):
+        raise HTTPException(status_code=404, detail="Audio overview not found.")
+    # FileResponse streams from disk (and uses the server's zero-copy path send extension when available)
+    return FileResponse(audio_path, media_type="audio/mpeg")
 
 # Mount static directory to serve generated files like audio overviews
 app.mount("/static", StaticFiles(directory=STATIC_DIRECTORY), name="static")
@@ -207,43 +291,53 @@ app.add_middleware(
 
 # --- Core Helper Function ---
 
-def process_and_save_file(file_on_disk_path: str, original_filename: str, db: Session) -> dict:
+def get_upload_path(original_filename: str) -> str:
+    """Returns the final on-disk path for a new source file: {uuid}_{original_filename} in the upload directory."""
+    return f"{UPLOAD_PATH_PREFIX}{uuid.uuid4()}_{original_filename}"
+
+def process_and_save_file(final_file_path: str, original_filename: str) -> dict:
     """
-    The main workflow for processing a file after it's on disk.
-    This includes renaming, transcribing, and saving to all databases.
+    The main workflow for processing a file after it's on disk at its final (UUID-prefixed) path.
+    This includes transcribing and saving to all databases.
+    Runs on the inference executor, so it opens its own writer session there (a request-scoped
+    session must not be used from another thread).
 
     Returns a dictionary with source_id, transcription_id, and file_path.
     """
-    # Rename the file with a UUID prefix
-    uuid_prefix = str(uuid.uuid4())
-    final_filename = f"{uuid_prefix}_{original_filename}"
-    final_file_path = os.path.join(UPLOAD_DIRECTORY, final_filename)
-    shutil.move(file_on_disk_path, final_file_path)
-
     # Transcribe the audio
     transcription_result = transcribe_audio(final_file_path)
     if not transcription_result or not transcription_result.get("text"):
         raise HTTPException(status_code=500, detail="Transcription failed or returned no text.")
     full_text = transcription_result["text"]
 
-    # Insert the source into our relational database
-    source = Source(file_path=final_file_path, project_id=1)
-    db.add(source)
-    db.commit()
-    db.refresh(source)
-
-    # Insert the transcription
-    transcription = Transcription(full_text=full_text, source_id=source.id)
-    db.add(transcription)
-    db.commit()
-    db.refresh(transcription)
+    with new_write_session() as db:
+        # Insert the source and its transcription in a single transaction (one commit / WAL fsync).
+        # The source is flushed first because the transcript file is named after its id.
+        source = Source(file_path=final_file_path, original_filename=original_filename, project_id=1)
+        db.add(source)
+        db.flush()
+        source_id = source.id
+
+        # Store the transcript text on disk and insert the transcription row pointing to it
+        full_text_path = save_transcript_text(source_id, full_text)
+        transcription = Transcription(
+            full_text_path=full_text_path,
+            source=source,
+            # Detect once at ingest so report/summary/overview never rescan the text
+            detected_language=detect_language(full_text)
+        )
+        db.add(transcription)
+        db.flush()
+        transcription_id = transcription.id
+        db.commit()
 
-    # Add the transcript to our vector database (ChromaDB) for future query/RAG use
-    add_transcript_to_db(source.id, transcription_result)
+    # Queue the transcript for our vector database (ChromaDB) for future query/RAG use;
+    # it is embedded and stored in the background, so the upload returns right away
+    enqueue_transcript(source_id, transcription_result)
 
     return {
-        "source_id": source.id,
-        "transcription_id": transcription.id,
+        "source_id": source_id,
+        "transcription_id": transcription_id,
         "transcription": full_text,  # Add the actual transcription text for frontend
         "file_path": final_file_path
     }
@@ -263,29 +357,26 @@ def health_check():
 
 # REQUIREMENT 5.4: API Testing Endpoints
 @app.get("/test-api/status", summary="Test all API connections and return comprehensive status")
-def get_api_status():
+async def get_api_status():
     """
     Test connections to all API providers and return aggregated results.
     This endpoint actually calls the test functions for each provider.
+    The providers are tested concurrently (each blocking test in its own thread, with a timeout).
 
     Returns:
         Dictionary with 'results' (individual test results) and 'summary' (aggregate stats)
     """
-    providers = ['ollama', 'openai', 'anthropic', 'google']
-    results = {}
-
     # Test each provider
-    for provider in providers:
-        results[provider] = test_api_connection(provider)
+    results = await test_all_connections()
 
     # Calculate summary statistics
     working_providers = sum(1 for r in results.values() if r['success'])
-    failed_providers = len(providers) - working_providers
+    failed_providers = len(results) - working_providers
 
     return {
         "results": results,
         "summary": {
-            "total_providers": len(providers),
+            "total_providers": len(results),
             "working_providers": working_providers,
             "failed_providers": failed_providers
         }
@@ -305,7 +396,7 @@ def test_provider_connection(provider: str):
     """
     valid_providers = ['ollama', 'openai', 'anthropic', 'google']
     if provider not in valid_providers:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=400,
             content={
                 "success": False,
@@ -319,7 +410,7 @@ def test_provider_connection(provider: str):
 
     # Return appropriate status code
     status_code = 200 if result["success"] else 400
-    return JSONResponse(status_code=status_code, content=result)
+    return ORJSONResponse(status_code=status_code, content=result)
 
 
 # STEP 2: Model Discovery Endpoints
@@ -340,7 +431,7 @@ def get_ollama_models_endpoint():
     ]
     """
     try:
-        models = get_ollama_models()
+        models = get_cached_models("ollama")
         return {
             "models": models,
             "count": len(models),
@@ -384,7 +475,7 @@ def get_openai_models_endpoint():
     ]
     """
     try:
-        models = get_openai_models()
+        models = get_cached_models("openai")
         return {
             "models": models,
             "count": len(models),
@@ -428,7 +519,7 @@ def get_anthropic_models_endpoint():
     ]
     """
     try:
-        models = get_anthropic_models()
+        models = get_cached_models("anthropic")
         return {
             "models": models,
             "count": len(models),
@@ -472,7 +563,7 @@ def get_google_models_endpoint():
     ]
     """
     try:
-        models = get_google_models()
+        models = get_cached_models("google")
         return {
             "models": models,
             "count": len(models),
@@ -499,7 +590,7 @@ def get_google_models_endpoint():
         }
 
 @app.get("/models/all", summary="Get all available models from all providers")
-def get_all_models_endpoint():
+async def get_all_models_endpoint():
     """
     Returns a comprehensive list of all available models from all providers.
     Aggregates results from Ollama, OpenAI, Anthropic, and Google Gemini.
@@ -531,28 +622,16 @@ def get_all_models_endpoint():
     """
     try:
         # STEP 6C-2: get_all_available_models() now returns dict with models and provider_errors
-        result = get_all_available_models()
-        
-        # Handle both old (list) and new (dict) return formats for backward compatibility
-        if isinstance(result, dict):
-            models = result.get("models", [])
-            provider_errors = result.get("provider_errors")
-        else:
-            # Backward compatibility: if it returns a list (shouldn't happen after 6C-1)
-            models = result
-            provider_errors = None
+        result = await get_all_available_models_async()
         
-        # Calculate provider breakdown
-        provider_counts = {}
-        for model in models:
-            provider = model.get('provider', 'unknown')
-            provider_counts[provider] = provider_counts.get(provider, 0) + 1
+        models = result["models"]
+        provider_errors = result["provider_errors"]
         
-        # Build response
+        # Build response (provider breakdown is precomputed by llm_service)
         response = {
             "models": models,
             "count": len(models),
-            "providers": provider_counts
+            "providers": result["provider_counts"]
         }
         
         # STEP 6C-2: Include provider_errors if present
@@ -570,41 +649,57 @@ def get_all_models_endpoint():
         }
 
 
+# Size of each chunk read from the upload stream and written to disk (1 MiB)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 @app.post("/upload/", summary="Upload a file and process it")
-def upload_file(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    temp_file_path = os.path.join(UPLOAD_DIRECTORY, file.filename)
-    with open(temp_file_path, "wb") as f:
-        shutil.copyfileobj(file.file, f)
-    result = process_and_save_file(temp_file_path, file.filename, db)
+async def upload_file(file: UploadFile = File(...)):
+    # Stream the upload straight to its final UUID-prefixed path without blocking the event loop
+    # (no temp file + move, which degrades to copy + delete across devices)
+    final_file_path = get_upload_path(file.filename)
+    async with aiofiles.open(final_file_path, "wb") as f:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await f.write(chunk)
+    # Transcription and database writes are blocking; run them on the inference executor
+    result = await run_inference(process_and_save_file, final_file_path, file.filename)
     return result
 
 @app.post("/download/", summary="Download a file from a URL and process it")
-def download_and_process(request: UrlRequest, db: Session = Depends(get_db)):
+async def download_and_process(request: UrlRequest):
     # STEP 29 FIX: Added UPLOAD_DIRECTORY as second argument to download_audio()
-    downloaded_path = download_audio(request.url, UPLOAD_DIRECTORY)
+    downloaded_path = await run_in_threadpool(download_audio, request.url, UPLOAD_DIRECTORY)
     if not downloaded_path:
         raise HTTPException(status_code=400, detail="Failed to download the media.")
     original_filename = os.path.basename(downloaded_path)
-    result = process_and_save_file(downloaded_path, original_filename, db)
+    # The downloader writes into UPLOAD_DIRECTORY, so this is a same-directory rename
+    final_file_path = get_upload_path(original_filename)
+    shutil.move(downloaded_path, final_file_path)
+    result = await run_inference(process_and_save_file, final_file_path, original_filename)
     return result
 
 @app.get("/sources/", response_model=List[dict], summary="List all sources")
-def list_sources(db: Session = Depends(get_db)):
-    sources = db.query(Source).all()
-    return [{"id": s.id, "original_filename": extract_original_filename(s.file_path), "file_path": s.file_path} for s in sources]
+async def list_sources(db: AsyncSession = Depends(get_async_db_ro)):
+    # Columns-only query: no ORM objects and no transcription join.
+    # original_filename is stored at ingest; older rows without it fall back to parsing file_path.
+    result = await db.execute(select(Source.id, Source.original_filename, Source.file_path))
+    return [
+        {"id": row.id, "original_filename": row.original_filename or extract_original_filename(row.file_path), "file_path": row.file_path}
+        for row in result.all()
+    ]
 
 @app.get("/sources/{source_id}/transcription/", summary="Get the transcription for a source")
-def get_transcription(source_id: int, db: Session = Depends(get_db)):
-    transcription = db.query(Transcription).filter(Transcription.source_id == source_id).first()
+def get_transcription(source_id: int, db: Session = Depends(get_db_ro)):
+    transcription = db.execute(TRANSCRIPTION_BY_SOURCE, {"source_id": source_id}).scalars().first()
     if not transcription:
         raise HTTPException(status_code=404, detail="Source not found.")
     return {"full_text": transcription.full_text}
 
 # --- Templates Endpoints ---
 @app.get("/templates/", response_model=List[TemplateResponse], summary="Get all templates")
-def get_templates(db: Session = Depends(get_db)):
-    templates = db.query(Template).all()
-    return templates
+async def get_templates(db: AsyncSession = Depends(get_async_db_ro)):
+    # Columns-only query: plain rows, no ORM instances or identity-map bookkeeping
+    result = await db.execute(select(Template.id, Template.name, Template.prompt_text, Template.language))
+    return [dict(row._mapping) for row in result]
 
 @app.post("/templates/", response_model=TemplateResponse, summary="Create a new template")
 def create_template(template: TemplateCreate, db: Session = Depends(get_db)):
@@ -612,11 +707,12 @@ def create_template(template: TemplateCreate, db: Session = Depends(get_db)):
     db.add(new_template)
     db.commit()
     db.refresh(new_template)
+    invalidate_template_cache()
     return new_template
 
 @app.put("/templates/{template_id}", response_model=TemplateResponse, summary="Update a template")
 def update_template(template_id: int, template: TemplateUpdate, db: Session = Depends(get_db)):
-    db_template = db.query(Template).filter(Template.id == template_id).first()
+    db_template = db.execute(TEMPLATE_BY_ID, {"template_id": template_id}).scalars().first()
     if not db_template:
         raise HTTPException(status_code=404, detail="Template not found.")
     if template.name is not None:
@@ -625,44 +721,57 @@ def update_template(template_id: int, template: TemplateUpdate, db: Session = De
         db_template.prompt_text = template.prompt_text
     db.commit()
     db.refresh(db_template)
+    invalidate_template_cache()
     return db_template
 
 @app.delete("/templates/{template_id}", status_code=204, summary="Delete a template")
 def delete_template(template_id: int, db: Session = Depends(get_db)):
-    db_template = db.query(Template).filter(Template.id == template_id).first()
+    db_template = db.execute(TEMPLATE_BY_ID, {"template_id": template_id}).scalars().first()
     if not db_template:
         raise HTTPException(status_code=404, detail="Template not found.")
     db.delete(db_template)
     db.commit()
+    invalidate_template_cache()
     return
 
 @app.post("/report/", summary="Generate a report for a source using a template")
-def generate_report(request: ReportRequest, db: Session = Depends(get_db)):
-    transcription = db.query(Transcription).filter(Transcription.source_id == request.source_id).first()
+async def generate_report(request: ReportRequest, db: Session = Depends(get_db_ro)):
+    # Database reads run on the request threadpool; the LLM call is awaited on the event loop
+    full_prompt = await run_in_threadpool(_build_report_prompt, request, db)
+    report_text = await generate_response_async(full_prompt, model_key=request.model_key)
+    return {"report_text": report_text, "prompt": full_prompt}
+
+def _build_report_prompt(request: ReportRequest, db: Session) -> str:
+    """Builds the /report/ prompt: template instructions followed by the source transcript."""
+    transcription = db.execute(TRANSCRIPTION_BY_SOURCE, {"source_id": request.source_id}).scalars().first()
     if not transcription:
         raise HTTPException(status_code=404, detail="Source not found.")
-    template = db.query(Template).filter(Template.id == request.template_id).first()
+    template = get_template_cached(request.template_id)
     if not template:
         raise HTTPException(status_code=404, detail="Template not found.")
 
     # Auto-detect language from transcription
-    detected_language = detect_language(transcription.full_text)
+    detected_language = get_transcription_language(transcription)
     language_instruction = f"""Write your response in {detected_language}.
 
 """
 
-    full_prompt = f"{language_instruction}{template.prompt_text}\n\n---\n\n{transcription.full_text}"
-    report_text = generate_response(full_prompt, model_key=request.model_key)
-    return {"report_text": report_text, "prompt": full_prompt}
+    return f"{language_instruction}{template.prompt_text}\n\n---\n\n{transcription.full_text}"
 
 @app.post("/summarize/", summary="Generate a summary for a source")
-def summarize_source(request: SummarizeRequest, db: Session = Depends(get_db)):
-    transcription = db.query(Transcription).filter(Transcription.source_id == request.source_id).first()
+async def summarize_source(request: SummarizeRequest, db: Session = Depends(get_db_ro)):
+    prompt = await run_in_threadpool(_build_summary_prompt, request, db)
+    summary = await generate_response_async(prompt, model_key=request.model_key)
+    return {"summary": summary, "prompt": prompt}
+
+def _build_summary_prompt(request: SummarizeRequest, db: Session) -> str:
+    """Builds the /summarize/ prompt for the source's transcript."""
+    transcription = db.execute(TRANSCRIPTION_BY_SOURCE, {"source_id": request.source_id}).scalars().first()
     if not transcription:
         raise HTTPException(status_code=404, detail="Source not found.")
 
     # FIXED: Auto-detect language and generate summary in the same language
-    detected_language = detect_language(transcription.full_text)
+    detected_language = get_transcription_language(transcription)
 
     prompt = f"""Please provide a concise summary of the key points from the following text. Use bullet points for the main ideas.
 
@@ -671,34 +780,72 @@ Write your summary in {detected_language}.
 ---
 
 {transcription.full_text}"""
-
-    summary = generate_response(prompt, model_key=request.model_key)
-    return {"summary": summary, "prompt": prompt}
+    return prompt
 
 @app.post("/query/", summary="Ask a question about a source")
-def query_source(request: QueryRequest):
-    context_chunks_with_metadata = query_db(query_text=request.query_text, source_id=request.source_id)
+async def query_source(request: QueryRequest):
+    # Vector search is blocking; run it on the request threadpool
+    context_chunks_with_metadata = await run_in_threadpool(query_db, query_text=request.query_text, source_id=request.source_id)
     if not context_chunks_with_metadata:
         return {"answer": "Could not find relevant information.", "citations": []}
     context_for_prompt = "\n---\n".join([chunk['text'] for chunk in context_chunks_with_metadata])
     prompt = f"Based ONLY on the following context, answer the user's question.\n\nCONTEXT:\n{context_for_prompt}\n\nQUESTION:\n{request.query_text}"
-    answer = generate_response(prompt, model_key=request.model_key)
+    answer = await generate_response_async(prompt, model_key=request.model_key)
     return {"answer": answer, "citations": context_chunks_with_metadata, "prompt": prompt}
 
+@app.post("/query/stream/", summary="Ask a question about a source, streaming the answer")
+def query_source_stream(request: QueryRequest):
+    """
+    Same question answering as /query/, but the answer is streamed as plain text while the
+    model generates it, so the first words arrive without waiting for the full completion.
+    Citations and the prompt are not included; use /query/ when they are needed.
+    """
+    context_chunks_with_metadata = query_db(query_text=request.query_text, source_id=request.source_id)
+    if not context_chunks_with_metadata:
+        return StreamingResponse(iter(("Could not find relevant information.",)), media_type="text/plain; charset=utf-8")
+    context_for_prompt = "\n---\n".join([chunk['text'] for chunk in context_chunks_with_metadata])
+    prompt = f"Based ONLY on the following context, answer the user's question.\n\nCONTEXT:\n{context_for_prompt}\n\nQUESTION:\n{request.query_text}"
+    try:
+        chunks = generate_response_stream(prompt, model_key=request.model_key)
+    except ValueError as e:
+        # Unknown/unavailable model: reported before any of the response is sent
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(chunks, media_type="text/plain; charset=utf-8")
+
 @app.post("/audio-overview/", summary="Generate an audio overview for a source")
-def create_audio_overview(request: SummarizeRequest, db: Session = Depends(get_db)):
+async def create_audio_overview(request: SummarizeRequest, db: Session = Depends(get_db_ro)):
+    # Database reads and the LLM call are blocking I/O; run them on the request threadpool
+    summary_text, prompt, audio_filename = await run_in_threadpool(_prepare_audio_overview, request, db)
+    audio_save_path = AUDIO_OVERVIEW_PATH_PREFIX + audio_filename
+
+    # Generate audio file on the inference executor (TTS is model-bound)
+    success = await run_inference(generate_audio, summary_text, audio_save_path)
+    if not success:
+        raise HTTPException(status_code=500, detail="Failed to generate audio file.")
+
+    # Return audio URL (existing logic)
+    audio_url = f"/static/audio_overviews/{audio_filename}"
+    return {"audio_url": audio_url, "summary_text": summary_text, "prompt": prompt}
+
+def _prepare_audio_overview(request: SummarizeRequest, db: Session) -> tuple:
+    """
+    Builds the overview text for /audio-overview/.
+
+    Returns:
+        tuple: (summary_text, prompt, audio_filename)
+    """
     # Get transcription (existing logic)
-    transcription = db.query(Transcription).filter(Transcription.source_id == request.source_id).first()
+    transcription = db.execute(TRANSCRIPTION_BY_SOURCE, {"source_id": request.source_id}).scalars().first()
     if not transcription:
         raise HTTPException(status_code=404, detail="Source not found.")
 
     # REQUIREMENT 3: Get source to extract filename for meaningful audio naming
-    source = db.query(Source).filter(Source.id == request.source_id).first()
+    source = db.execute(SOURCE_BY_ID, {"source_id": request.source_id}).scalars().first()
     if not source:
         raise HTTPException(status_code=404, detail="Source record not found.")
 
     # Auto-detect language and generate overview (existing logic)
-    detected_language = detect_language(transcription.full_text)
+    detected_language = get_transcription_language(transcription)
 
     prompt = f"""Generate a narrative overview of the following text. Write it as a series of well-written paragraphs with concatenated ideas, suitable for a short audio briefing. Do not use bullet points or numbered lists.
 
@@ -715,19 +862,47 @@ Write your overview in {detected_language}.
     # REQUIREMENT 3: Generate meaningful filename using sanitized original filename
     sanitized_filename = sanitize_filename_for_audio(source.file_path)
     audio_filename = f"overview_{request.source_id}_{sanitized_filename}.mp3"
-    audio_save_path = os.path.join(AUDIO_OVERVIEW_DIRECTORY, audio_filename)
-
-    # Generate audio file (existing logic)
-    success = generate_audio(summary_text, audio_save_path)
-    if not success:
-        raise HTTPException(status_code=500, detail="Failed to generate audio file.")
-
-    # Return audio URL (existing logic)
-    audio_url = f"/static/audio_overviews/{audio_filename}"
-    return {"audio_url": audio_url, "summary_text": summary_text, "prompt": prompt}
+    return summary_text, prompt, audio_filename
+
+# --- Export content generators (used when the frontend doesn't provide the content) ---
+# Each takes (source, request, is_markdown, template) and returns an iterable of string parts that is
+# streamed to the client in order; the source's transcription is known to exist.
+# template is only set for reports.
+
+def _export_transcript(source: Source, request: ExportRequest, is_markdown: bool, template: CachedTemplate) -> Iterable[str]:
+    if is_markdown:
+        transcription_result = transcribe_audio(source.file_path)
+        return export_service.format_transcript_md(transcription_result)
+    # Streamed straight from the transcript file, never loaded whole
+    return iter_transcript_text(source.transcription.full_text_path)
+
+def _export_summary(source: Source, request: ExportRequest, is_markdown: bool, template: CachedTemplate) -> Iterable[str]:
+    return export_service.generate_and_format_summary(source.transcription, request.model_key, is_markdown)
+
+def _export_overview(source: Source, request: ExportRequest, is_markdown: bool, template: CachedTemplate) -> Iterable[str]:
+    return export_service.generate_and_format_overview(source.transcription, request.model_key, is_markdown)
+
+def _export_report(source: Source, request: ExportRequest, is_markdown: bool, template: CachedTemplate) -> Iterable[str]:
+    # Reuses the template export_content fetched for the filename (no second lookup)
+    return export_service.generate_and_format_report(source.transcription, template, request.model_key, is_markdown)
+
+_EXPORT_HANDLERS = {
+    ContentType.TRANSCRIPT: _export_transcript,
+    ContentType.SUMMARY: _export_summary,
+    ContentType.OVERVIEW: _export_overview,
+    ContentType.REPORT: _export_report,
+}
+
+def _content_disposition(filename: str) -> str:
+    """
+    Builds an attachment Content-Disposition header value that is safe for non-ASCII filenames
+    (e.g. Spanish template names): an ASCII fallback plus the RFC 5987 UTF-8 form (filename*).
+    """
+    ascii_filename = filename.encode("ascii", "replace").decode("ascii").replace("?", "_")
+    return f"attachment; filename=\"{ascii_filename}\"; filename*=UTF-8''{quote(filename, safe='')}"
 
 @app.post("/export/", summary="Export content to a file")
-def export_content(request: ExportRequest, db: Session = Depends(get_db)):
+def export_content(request: ExportRequest, db: Session = Depends(get_db_ro)):
     """
     Export content to a downloadable file.
 
@@ -736,12 +911,11 @@ def export_content(request: ExportRequest, db: Session = Depends(get_db)):
 
     FALLBACK: If no content provided, generates content from database (old behavior).
     """
-    source = db.query(Source).filter(Source.id == request.source_id).first()
+    source = db.execute(SOURCE_BY_ID, {"source_id": request.source_id}).scalars().first()
     if not source:
         raise HTTPException(status_code=404, detail="Source document not found.")
 
-    content = ""
-    is_markdown = request.format == 'md'
+    is_markdown = request.format is ExportFormat.MD
     media_type = "text/markdown; charset=utf-8" if is_markdown else "text/plain; charset=utf-8"
 
     # Set default filename
@@ -749,10 +923,11 @@ def export_content(request: ExportRequest, db: Session = Depends(get_db)):
     filename = f"{filename_prefix}_{request.source_id}.{request.format}"
 
     # For reports, always generate custom filename with template name
-    if request.content_type == 'report':
+    template = None
+    if request.content_type is ContentType.REPORT:
         if not request.template_id:
             raise HTTPException(status_code=400, detail="Template ID is required for report export.")
-        template = db.query(Template).filter(Template.id == request.template_id).first()
+        template = get_template_cached(request.template_id)
         if not template:
             raise HTTPException(status_code=404, detail="Template not found.")
         sanitized_template_name = "".join(c for c in template.name if c.isalnum() or c in ('_')).rstrip()
@@ -763,40 +938,21 @@ def export_content(request: ExportRequest, db: Session = Depends(get_db)):
 
     if provided_content:
         # Use the provided content from frontend
-        content = export_service.format_provided_content(
+        content = (export_service.format_provided_content(
             provided_content,
             request.content_type,
             is_markdown
-        )
+        ),)
     else:
         # FALLBACK: Generate content (old behavior)
-        if request.content_type == 'transcript':
-            if not source.transcription:
-                raise HTTPException(status_code=404, detail="Transcription not found.")
+        # Every content type is generated from the transcription
+        if not source.transcription:
+            raise HTTPException(status_code=404, detail="Transcription not found.")
+        # ExportRequest.content_type is a ContentType, so the handler always exists
+        content = _EXPORT_HANDLERS[request.content_type](source, request, is_markdown, template)
 
-            if is_markdown:
-                transcription_result = transcribe_audio(source.file_path)
-                content = export_service.format_transcript_md(transcription_result)
-            else:
-                content = source.transcription.full_text
-
-        elif request.content_type in ['summary', 'overview']:
-            if not source.transcription:
-                raise HTTPException(status_code=404, detail="Transcription not found.")
-            if request.content_type == 'summary':
-                content = export_service.generate_and_format_summary(source.transcription, request.model_key, is_markdown)
-            else: # overview
-                content = export_service.generate_and_format_overview(source.transcription, request.model_key, is_markdown)
-
-        elif request.content_type == 'report':
-            if not source.transcription:
-                raise HTTPException(status_code=404, detail="Transcription not found.")
-            # Template was already fetched above for filename generation
-            template = db.query(Template).filter(Template.id == request.template_id).first()
-            content = export_service.generate_and_format_report(source.transcription, template, request.model_key, is_markdown)
-
-    headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
-    return Response(content=content, media_type=media_type, headers=headers)
+    headers = {"content-disposition": _content_disposition(filename)}
+    return StreamingResponse(export_service.iter_encoded_chunks(content), media_type=media_type, headers=headers)
 
 
 # --- DEBUG HELPER FUNCTION ---
@@ -804,109 +960,123 @@ def mask_api_key(key: str) -> str:
     """Safely mask API key for logging."""
     if not key:
         return "<empty>"
-    if len(key) <= 4:
-        return "*" * len(key)
-    return f"{key[:4]}...{key[-2:]} (length: {len(key)})"
+    key_length = len(key)
+    if key_length <= 4:
+        return "*" * key_length
+    return f"{key[:4]}...{key[-2:]} (length: {key_length})"
 
 
 # --- Configuration Endpoints ---
-@app.get("/config/", response_model=Dict, summary="Get the current application configuration")
-def get_config():
+@app.get("/config/", response_model=ConfigResponse, summary="Get the current application configuration")
+def get_config(request: Request, response: Response):
+    # Conditional GET: if the client's copy matches config.json (by mtime/size), skip the
+    # load, key decryption and serialization entirely
+    etag = get_config_etag()
+    if etag is not None:
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"etag": etag})
+        response.headers["etag"] = etag
     current_config = load_config()
-    current_config["api_keys"]["openai"] = decrypt_key(current_config["api_keys"].get("openai", ""))
-    current_config["api_keys"]["anthropic"] = decrypt_key(current_config["api_keys"].get("anthropic", ""))
-    current_config["api_keys"]["google"] = decrypt_key(current_config["api_keys"].get("google", ""))
+    api_keys = current_config["api_keys"]
+    # One key derivation for all three providers
+    api_keys.update(decrypt_keys({provider: api_keys.get(provider, "") for provider in API_KEY_PROVIDERS}))
     return current_config
 
-@app.put("/config/", status_code=204, summary="Update the application configuration")
-def update_config(updated_config: Dict):
-    """
-    Update application configuration with comprehensive debug logging.
-    Safely masks API keys in all log output.
-    """
-    print("=" * 70)
-    print(f"[DEBUG main.py] update_config() endpoint called")
-    print("=" * 70)
-
-    # Log what was received
-    print(f"[DEBUG main.py] Received config structure:")
-    print(f"[DEBUG main.py]   - Top-level keys: {list(updated_config.keys())}")
-    print(f"[DEBUG main.py]   - Contains 'default_model': {'default_model' in updated_config}")
-    print(f"[DEBUG main.py]   - Contains 'api_keys': {'api_keys' in updated_config}")
-    print(f"[DEBUG main.py]   - Contains 'data_storage_path': {'data_storage_path' in updated_config}")
-
-    # Check default_model
-    if "default_model" in updated_config:
-        print(f"[DEBUG main.py] default_model received: '{updated_config['default_model']}'")
+def _log_config_update(updated_config: ConfigUpdate):
+    """Logs a received /config/ update at DEBUG level with API keys masked (no-op otherwise)."""
+    if not config_logger.isEnabledFor(logging.DEBUG):
+        return
+    fields_set = updated_config.model_fields_set
+    config_logger.debug("Received config fields: %s", sorted(fields_set))
+    if "default_model" in fields_set:
+        config_logger.debug("default_model received: '%s'", updated_config.default_model)
 
     # Check api_keys with SAFE masking
-    if "api_keys" in updated_config:
-        print(f"[DEBUG main.py] API Keys section found:")
-        api_keys = updated_config['api_keys']
-
-        # Check structure
-        if isinstance(api_keys, dict):
-            print(f"[DEBUG main.py]   - api_keys is a dict with keys: {list(api_keys.keys())}")
-
-            # Log each provider safely
-            for provider in ["openai", "anthropic", "google"]:
-                if provider in api_keys:
-                    raw_value = api_keys[provider]
-                    masked_value = mask_api_key(raw_value)
-                    print(f"[DEBUG main.py]   - {provider}: {masked_value}")
-                else:
-                    print(f"[DEBUG main.py]   - {provider}: <not in request>")
-        else:
-            print(f"[DEBUG main.py]   - WARNING: api_keys is not a dict! Type: {type(api_keys)}")
-            print(f"[DEBUG main.py]   - Value: {api_keys}")
+    if updated_config.api_keys is not None:
+        api_keys = updated_config.api_keys
+        for provider in API_KEY_PROVIDERS:
+            if provider in api_keys.model_fields_set:
+                config_logger.debug("  - %s: %s", provider, mask_api_key(getattr(api_keys, provider)))
+            else:
+                config_logger.debug("  - %s: <not in request>", provider)
     else:
-        print(f"[DEBUG main.py] WARNING: No 'api_keys' in updated_config!")
-        print(f"[DEBUG main.py] Full config received: {updated_config}")
+        config_logger.debug("No 'api_keys' in updated_config")
 
-    print("-" * 70)
-    print(f"[DEBUG main.py] Starting config update process...")
+def _apply_config_update(updated_config: ConfigUpdate, replace_api_keys: bool) -> bool:
+    """
+    Applies the fields present in a /config/ update and saves the config only if something changed.
+
+    replace_api_keys=True (PUT): api_keys replaces every provider key (missing ones become "").
+    replace_api_keys=False (PATCH): only the provider keys present in the request are applied.
+    Keys equal to the stored ones keep their existing ciphertext instead of being re-encrypted.
 
-    # Load current config
-    print(f"[DEBUG main.py] Step 1: Loading current config...")
+    Returns:
+        True if the config was saved, False if the update was a no-op.
+    """
+    # Load current config (a stat() when cached, a file read otherwise)
     current_config = load_config()
-    print(f"[DEBUG main.py]   - Current config loaded successfully")
+    changed = False
 
     # Update default_model
-    if "default_model" in updated_config:
-        print(f"[DEBUG main.py] Step 2: Updating default_model...")
-        current_config["default_model"] = updated_config["default_model"]
-        print(f"[DEBUG main.py]   - default_model updated to: '{updated_config['default_model']}'")
+    if "default_model" in updated_config.model_fields_set and current_config.get("default_model") != updated_config.default_model:
+        current_config["default_model"] = updated_config.default_model
+        changed = True
 
     # Update and encrypt API keys
-    if "api_keys" in updated_config:
-        print(f"[DEBUG main.py] Step 3: Processing API keys...")
+    if updated_config.api_keys is not None:
+        api_keys = updated_config.api_keys
+        if replace_api_keys:
+            providers = API_KEY_PROVIDERS
+        else:
+            providers = [provider for provider in API_KEY_PROVIDERS if provider in api_keys.model_fields_set]
+        stored_keys = current_config["api_keys"]
+        # AES-CBC uses a random IV, so compare plaintexts (one key derivation for the batch)
+        stored_plaintext = decrypt_keys({provider: stored_keys.get(provider, "") for provider in providers})
+        # Changed keys only; an empty value only matches if nothing (decryptable or not) is stored
+        plaintext_keys = {
+            provider: value
+            for provider in providers
+            if (value := getattr(api_keys, provider)) != stored_plaintext[provider]
+            or (not value and stored_keys.get(provider))
+        }
 
-        for provider in ["openai", "anthropic", "google"]:
-            plaintext_key = updated_config["api_keys"].get(provider, "")
+        if plaintext_keys:
+            # One key derivation for all changed providers; empty keys stay empty
+            encrypted_keys = encrypt_keys(plaintext_keys)
+            for provider, encrypted_key in encrypted_keys.items():
+                if encrypted_key:
+                    config_logger.debug("%s key encrypted successfully (length: %d)", provider, len(encrypted_key))
+                elif plaintext_keys[provider]:
+                    config_logger.warning("%s key encryption FAILED (returned empty string)", provider)
+            stored_keys.update(encrypted_keys)
+            changed = True
 
-            if plaintext_key:
-                print(f"[DEBUG main.py]   - Encrypting {provider} key: {mask_api_key(plaintext_key)}")
-                encrypted_key = encrypt_key(plaintext_key)
+    if changed:
+        save_config(current_config)
+    return changed
 
-                if encrypted_key:
-                    current_config["api_keys"][provider] = encrypted_key
-                    print(f"[DEBUG main.py]   - ✓ {provider} encrypted successfully (length: {len(encrypted_key)})")
-                else:
-                    print(f"[DEBUG main.py]   - ✗ {provider} encryption FAILED (returned empty string)")
-                    current_config["api_keys"][provider] = ""
-            else:
-                print(f"[DEBUG main.py]   - {provider} key is empty, skipping encryption")
-                current_config["api_keys"][provider] = ""
-    else:
-        print(f"[DEBUG main.py] Step 3: SKIPPED - No api_keys in request")
+@app.put("/config/", status_code=204, summary="Update the application configuration")
+async def update_config(updated_config: ConfigUpdate):
+    """
+    Update application configuration with debug logging (enable DEBUG on "insightslm.config").
+    Only the top-level fields present in the request are applied; api_keys replaces all provider keys.
+    Safely masks API keys in all log output.
+    File I/O and key encryption run on the threadpool; the event loop only does the bookkeeping.
+    """
+    _log_config_update(updated_config)
+    saved = await run_in_threadpool(_apply_config_update, updated_config, True)
+    config_logger.debug("update_config() completed (saved: %s)", saved)
 
-    # Save config
-    print(f"[DEBUG main.py] Step 4: Saving updated config...")
-    save_config(current_config)
-    print(f"[DEBUG main.py]   - Config saved successfully")
+    return
 
-    print("=" * 70)
-    print(f"[DEBUG main.py] update_config() completed successfully")
-    print("=" * 70)
+@app.patch("/config/", status_code=204, summary="Partially update the application configuration")
+async def patch_config(updated_config: ConfigPatch):
+    """
+    Applies only the fields present in the request, down to individual API keys,
+    and skips the write entirely when nothing changed.
+    """
+    _log_config_update(updated_config)
+    saved = await run_in_threadpool(_apply_config_update, updated_config, False)
+    config_logger.debug("patch_config() completed (saved: %s)", saved)
 
-    return
\ No newline at end of file
+    return
@@ -1,16 +1,21 @@
-from pydantic import BaseModel, ConfigDict
-from typing import Optional, Literal
+from enum import StrEnum
+from pydantic import BaseModel, ConfigDict, field_validator
+from typing import Optional
+
+# Base for request bodies: immutable once parsed, and unknown fields are rejected
+class RequestModel(BaseModel):
+    model_config = ConfigDict(extra="forbid", frozen=True)
 
 # --- Analysis Schemas ---
 
 # Used for the /query/ endpoint
-class QueryRequest(BaseModel):
+class QueryRequest(RequestModel):
     source_id: int
     query_text: str
     model_key: Optional[str] = "ollama_mistral"
 
 # Used for /summarize/ and /audio-overview/ endpoints
-class SummarizeRequest(BaseModel):
+class SummarizeRequest(RequestModel):
     source_id: int
     model_key: Optional[str] = "ollama_mistral"
 
@@ -18,20 +23,20 @@ class SummarizeRequest(BaseModel):
 # --- Transcription Schema ---
 
 # Used for the /transcribe-url/ endpoint
-class UrlRequest(BaseModel):
+class UrlRequest(RequestModel):
     url: str
 
 
 # --- Template & Report Schemas ---
 
 # Used when creating a new template via POST /templates/
-class TemplateCreate(BaseModel):
+class TemplateCreate(RequestModel):
     name: str
     prompt_text: str
     language: str
 
 # Used when updating a template via PUT /templates/{id}
-class TemplateUpdate(BaseModel):
+class TemplateUpdate(RequestModel):
     name: Optional[str] = None
     prompt_text: Optional[str] = None
     language: Optional[str] = None
@@ -41,10 +46,11 @@ class TemplateResponse(TemplateCreate):
     id: int
 
     # Pydantic v2 configuration to allow mapping from SQLAlchemy ORM models
-    model_config = ConfigDict(from_attributes=True)
+    # (overrides TemplateCreate's request settings: ORM attributes beyond the fields are ignored)
+    model_config = ConfigDict(from_attributes=True, extra="ignore", frozen=False)
 
 # Used for the /report/ endpoint
-class ReportRequest(BaseModel):
+class ReportRequest(RequestModel):
     source_id: int
     template_id: int
     model_key: Optional[str] = "ollama_mistral"
@@ -52,16 +58,64 @@ class ReportRequest(BaseModel):
 
 # --- Export Schema ---
 
+# Defines the specific types of content that can be exported
+# (StrEnum: members compare, hash and format exactly like their string values)
+class ContentType(StrEnum):
+    TRANSCRIPT = "transcript"
+    SUMMARY = "summary"
+    OVERVIEW = "overview"
+    REPORT = "report"
+
+# Defines the allowed export formats
+class ExportFormat(StrEnum):
+    TXT = "txt"
+    MD = "md"
+
 # Used for the /export/ endpoint
-class ExportRequest(BaseModel):
+class ExportRequest(RequestModel):
     source_id: int
-    # Defines the specific types of content that can be exported
-    content_type: Literal['transcript', 'summary', 'overview', 'report']
-    # Defines the allowed export formats
-    format: Literal['txt', 'md']
+    content_type: ContentType
+    format: ExportFormat
     # Optional fields needed for specific content types
     template_id: Optional[int] = None
     model_key: Optional[str] = "ollama_mistral"
     # NEW: Optional content field - if provided, exports this exact content
     # This allows exporting exactly what's displayed on screen
-    content: Optional[str] = None
\ No newline at end of file
+    content: Optional[str] = None
+
+# --- Configuration Schemas ---
+
+# API keys per provider (decrypted in GET /config/ responses, plaintext in PUT /config/ requests)
+class ApiKeys(BaseModel):
+    openai: str = ""
+    anthropic: str = ""
+    google: str = ""
+
+# Used as the response model for GET /config/
+class ConfigResponse(BaseModel):
+    default_model: str
+    api_keys: ApiKeys
+    data_storage_path: str
+
+    # Keep any other keys stored in config.json
+    model_config = ConfigDict(extra="allow")
+
+# Used for PUT /config/ (only the fields present in the request are applied)
+class ConfigUpdate(BaseModel):
+    default_model: Optional[str] = None
+    api_keys: Optional[ApiKeys] = None
+    data_storage_path: Optional[str] = None
+
+    model_config = ConfigDict(extra="allow")
+
+    # Omitting default_model leaves it unchanged, but an explicit null would be stored and break GET /config/
+    @field_validator("default_model")
+    @classmethod
+    def default_model_not_null(cls, value: Optional[str]) -> str:
+        if value is None:
+            raise ValueError("default_model cannot be null")
+        return value
+
+# Used for PATCH /config/ (same fields; individual API keys may also be omitted)
+class ConfigPatch(ConfigUpdate):
+    pass
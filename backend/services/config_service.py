@@ -3,22 +3,30 @@
 # CHANGES: Add safety check to create .encryption_key file if missing
 # REASON: Flag was set but file was never created, breaking encryption
 
-import json
+import copy
+import functools
+import hashlib
+import orjson
 import os
-import base64
+import binascii
 import uuid
 import platform
+import tempfile
+import threading
 import traceback
 from appdirs import user_data_dir
 from Crypto.Cipher import AES
-from Crypto.Util.Padding import pad, unpad
-from Crypto.Protocol.KDF import PBKDF2
+from Crypto.Hash import SHA256
+from Crypto.Protocol.KDF import HKDF
+from Crypto.Util.Padding import unpad
 from Crypto.Random import get_random_bytes
 
 # --- Constants ---
 # Define application details for appdirs
 APP_NAME = "InsightsLM"
 APP_AUTHOR = "InsightsLM_Dev"
+# APP_NAME as bytes, mixed into the master key for key derivation
+_APP_NAME_BYTES = APP_NAME.encode('utf-8')
 
 # Get the standard user data directory for this application
 APP_DATA_DIR = user_data_dir(APP_NAME, APP_AUTHOR)
@@ -26,6 +34,9 @@ APP_DATA_DIR = user_data_dir(APP_NAME, APP_AUTHOR)
 # Define the full path for our configuration file
 CONFIG_FILE_PATH = os.path.join(APP_DATA_DIR, "config.json")
 
+# Cloud providers whose API keys are stored (encrypted) under config["api_keys"]
+API_KEY_PROVIDERS = ("openai", "anthropic", "google")
+
 # STEP 1 CHANGE: Define path for persistent encryption key file
 ENCRYPTION_KEY_FILE = os.path.join(APP_DATA_DIR, ".encryption_key")
 
@@ -33,13 +44,37 @@ ENCRYPTION_KEY_FILE = os.path.join(APP_DATA_DIR, ".encryption_key")
 OLD_SECRET_KEY = b'a_very_secret_key_for_insightslm'
 SALT = b'a_fixed_salt_for_derivation'
 
-# Debug flag - set to False to disable debug logging in production
+# PBKDF2 parameters. These match PyCryptodome's PBKDF2 defaults (HMAC-SHA1, 1000 iterations) that
+# legacy values (CBC and version 0x02) were encrypted with, so they must not change.
+PBKDF2_HASH = 'sha1'
+PBKDF2_ITERATIONS = 1000
+
+# Encrypted API keys start with a version byte. New values are always ENCRYPTION_VERSION_GCM_HKDF.
+# Older formats stay readable: 0x02 is AES-GCM under the PBKDF2-derived key, and values without a
+# version byte are AES-CBC (16-byte IV + padded ciphertext) under the PBKDF2-derived key.
+ENCRYPTION_VERSION_GCM = b'\x02'
+ENCRYPTION_VERSION_GCM_HKDF = b'\x03'
+# HKDF label that ties the derived key to its use (domain separation)
+HKDF_CONTEXT = b'InsightsLM-AES256'
+GCM_HEADER_LENGTH = 1 + 16 + 16  # version + nonce + tag
+
+def _pbkdf2(password: bytes) -> bytes:
+    """Derives a 32-byte AES-256 key from password and SALT (hashlib/OpenSSL implementation)."""
+    return hashlib.pbkdf2_hmac(PBKDF2_HASH, password, SALT, PBKDF2_ITERATIONS, dklen=32)
+
+# Debug flag - set to False to disable debug logging in production.
+# debug_log() formats its args lazily; call sites that build expensive messages (key masking,
+# key listings) also check it before computing them.
 DEBUG_ENABLED = True
 
-def debug_log(message: str):
-    """Safe debug logging that can be easily disabled."""
+def debug_log(message: str, *args):
+    """
+    Safe debug logging that can be easily disabled.
+    Extra args are %-formatted into message only when DEBUG_ENABLED, so hot paths pass them
+    separately (debug_log("length: %s", n)) instead of building an f-string that is thrown away.
+    """
     if DEBUG_ENABLED:
-        print(f"[DEBUG config_service] {message}")
+        print(f"[DEBUG config_service] {message % args if args else message}")
 
 def error_log(message: str, exception: Exception = None):
     """Error logging with optional exception details."""
@@ -57,7 +92,49 @@ def mask_sensitive(data: str, show_chars: int = 4) -> str:
 
 # --- File-Based Key Management (STEP 1 NEW) ---
 
+# The master key is cached together with the key file's (mtime_ns, inode, size), so each use costs
+# one stat() and the file is only re-read if it was replaced or edited. Derived keys are cached per
+# master key and follow it. The lock keeps concurrent requests from racing on first use
+# (including creating the key file twice).
+_key_cache_lock = threading.Lock()
+_master_key_cache = None   # (key file signature, master key)
+_derived_key_cache = None  # (master key, derived key)
+_legacy_key_cache = None   # (master key, legacy derived key)
+
+def _key_file_signature():
+    """(mtime_ns, inode, size) of the key file, or None if it does not exist."""
+    try:
+        st = os.stat(ENCRYPTION_KEY_FILE)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_ino, st.st_size)
+
+def invalidate_key_cache():
+    """Forgets the cached master/derived keys so the next use re-reads the key file."""
+    global _master_key_cache, _derived_key_cache, _legacy_key_cache
+    with _key_cache_lock:
+        _master_key_cache = None
+        _derived_key_cache = None
+        _legacy_key_cache = None
+    _decrypt_with_key.cache_clear()
+
 def get_or_create_master_key() -> bytes:
+    """Returns the master key, re-reading (or creating) the key file only when it changed. See _get_or_create_master_key_uncached()."""
+    global _master_key_cache
+    signature = _key_file_signature()
+    cached = _master_key_cache
+    if cached is not None and signature is not None and cached[0] == signature:
+        return cached[1]
+    with _key_cache_lock:
+        cached = _master_key_cache
+        if cached is None or signature is None or cached[0] != signature:
+            master_key = _get_or_create_master_key_uncached()
+            # Re-stat: the file may have just been created
+            cached = (_key_file_signature(), master_key)
+            _master_key_cache = cached
+        return cached[1]
+
+def _get_or_create_master_key_uncached() -> bytes:
     """
     STEP 1 NEW FUNCTION: Get or create persistent master encryption key.
     
@@ -129,6 +206,56 @@ def get_or_create_master_key() -> bytes:
 # --- Encryption & Decryption Helpers ---
 
 def get_encryption_key():
+    """Returns the derived AES key, deriving it only on first use. See _derive_encryption_key()."""
+    global _derived_key_cache
+    master_key = get_or_create_master_key()
+    cached = _derived_key_cache
+    if cached is not None and cached[0] == master_key:
+        return cached[1]
+    with _key_cache_lock:
+        cached = _derived_key_cache
+        if cached is None or cached[0] != master_key:
+            cached = (master_key, _derive_encryption_key(master_key))
+            _derived_key_cache = cached
+        return cached[1]
+
+def _derive_encryption_key(master_key: bytes) -> bytes:
+    """
+    Derives the AES key for new values from the file-based master key with one HKDF-SHA256.
+    
+    The master key is already 256 random bits, so password stretching (PBKDF2) adds nothing;
+    HKDF only binds the key to this app and purpose (SALT + HKDF_CONTEXT).
+    
+    Returns:
+        bytes: 32-byte derived encryption key for AES-256
+    """
+    debug_log("Deriving encryption key (HKDF)...")
+    try:
+        derived_key = HKDF(master_key, 32, SALT, SHA256, context=HKDF_CONTEXT)
+        debug_log("Encryption key derived successfully (length: %s bytes)", len(derived_key))
+        return derived_key
+    except Exception as e:
+        error_log(f"Failed to derive encryption key: {e}", e)
+        raise
+
+def get_legacy_encryption_key() -> bytes:
+    """
+    Returns the PBKDF2-derived key that values written before HKDF were encrypted with.
+    Only needed to read those values, so PBKDF2 runs on first such read, then it is cached.
+    """
+    global _legacy_key_cache
+    master_key = get_or_create_master_key()
+    cached = _legacy_key_cache
+    if cached is not None and cached[0] == master_key:
+        return cached[1]
+    with _key_cache_lock:
+        cached = _legacy_key_cache
+        if cached is None or cached[0] != master_key:
+            cached = (master_key, _derive_legacy_encryption_key(master_key))
+            _legacy_key_cache = cached
+        return cached[1]
+
+def _derive_legacy_encryption_key(master_key: bytes) -> bytes:
     """
     STEP 1 MODIFIED: Derives encryption key from persistent file-based master key.
     
@@ -140,19 +267,21 @@ def get_encryption_key():
     2. App-specific derivation (master_key + APP_NAME)
     3. PBKDF2 key derivation (additional security layer)
     
+    Superseded by _derive_encryption_key() for new values; kept to read older ones.
+    
     Returns:
         bytes: 32-byte derived encryption key for AES-256
     """
-    debug_log("Deriving encryption key...")
+    debug_log("Deriving legacy encryption key...")
     try:
         # STEP 1 CHANGE: Use persistent file-based key instead of MAC address
-        master_key = get_or_create_master_key()
+        # (master_key comes from get_or_create_master_key())
         
         # Combine master key with app name for app-specific uniqueness
-        app_specific_key = master_key + APP_NAME.encode('utf-8')
+        app_specific_key = master_key + _APP_NAME_BYTES
         
         debug_log("Running PBKDF2 key derivation...")
-        derived_key = PBKDF2(app_specific_key, SALT, dkLen=32)  # 32 bytes for AES-256
+        derived_key = _pbkdf2(app_specific_key)  # 32 bytes for AES-256
         
         debug_log(f"Encryption key derived successfully (length: {len(derived_key)} bytes)")
         return derived_key
@@ -162,7 +291,8 @@ def get_encryption_key():
 
 def encrypt_key(api_key: str) -> str:
     """Encrypts an API key and returns it as a base64 encoded string."""
-    debug_log(f"encrypt_key() called with key: {mask_sensitive(api_key)}")
+    if DEBUG_ENABLED:
+        debug_log(f"encrypt_key() called with key: {mask_sensitive(api_key)}")
     
     if not api_key:
         debug_log("Empty API key provided, returning empty string")
@@ -170,30 +300,32 @@ def encrypt_key(api_key: str) -> str:
     
     try:
         debug_log("Step 1: Getting encryption key...")
-        key = get_encryption_key()
-        
-        debug_log("Step 2: Creating AES cipher in CBC mode...")
-        cipher = AES.new(key, AES.MODE_CBC)
-        debug_log(f"AES cipher created (IV length: {len(cipher.iv)} bytes)")
-        
-        debug_log("Step 3: Encoding and padding plaintext...")
-        plaintext_bytes = api_key.encode('utf-8')
-        debug_log(f"Plaintext encoded to {len(plaintext_bytes)} bytes")
-        
-        padded_data = pad(plaintext_bytes, AES.block_size)
-        debug_log(f"Data padded to {len(padded_data)} bytes (block size: {AES.block_size})")
+        return _encrypt_with_key(api_key, get_encryption_key())
+    except Exception as e:
+        error_log(f"Exception during encryption: {type(e).__name__}: {e}", e)
+        return ""
+
+def _encrypt_with_key(api_key: str, key: bytes) -> str:
+    """
+    Encrypts a non-empty API key with an already-derived AES key (see encrypt_key).
+    
+    Output format (base64): version byte (ENCRYPTION_VERSION_GCM_HKDF) + 16-byte nonce + 16-byte tag + ciphertext.
+    GCM needs no padding and its tag lets decryption detect corrupted or wrong-key values.
+    """
+    try:
+        debug_log("Step 2: Creating AES cipher in GCM mode...")
+        cipher = AES.new(key, AES.MODE_GCM)
         
-        debug_log("Step 4: Encrypting data...")
-        ct_bytes = cipher.encrypt(padded_data)
-        debug_log(f"Encryption successful, ciphertext length: {len(ct_bytes)} bytes")
+        debug_log("Step 3: Encrypting data...")
+        ct_bytes, tag = cipher.encrypt_and_digest(api_key.encode('utf-8'))
+        debug_log("Encryption successful, ciphertext length: %s bytes", len(ct_bytes))
         
-        debug_log("Step 5: Combining IV + ciphertext and encoding to base64...")
-        combined = cipher.iv + ct_bytes
-        debug_log(f"Combined IV+ciphertext length: {len(combined)} bytes")
+        debug_log("Step 4: Combining version + nonce + tag + ciphertext and encoding to base64...")
+        combined = ENCRYPTION_VERSION_GCM_HKDF + cipher.nonce + tag + ct_bytes
         
-        encrypted_result = base64.b64encode(combined).decode('utf-8')
-        debug_log(f"Base64 encoding successful, final result length: {len(encrypted_result)} chars")
-        debug_log(f"Encrypted result preview: {encrypted_result[:20]}...{encrypted_result[-20:]}")
+        encrypted_result = binascii.b2a_base64(combined, newline=False).decode('ascii')
+        debug_log("Base64 encoding successful, final result length: %s chars", len(encrypted_result))
+        debug_log("Encrypted result preview: %s...%s", encrypted_result[:20], encrypted_result[-20:])
         
         return encrypted_result
         
@@ -203,7 +335,8 @@ def encrypt_key(api_key: str) -> str:
 
 def decrypt_key(encrypted_key: str) -> str:
     """Decrypts a base64 encoded API key string."""
-    debug_log(f"decrypt_key() called with encrypted key: {mask_sensitive(encrypted_key, 8)}")
+    if DEBUG_ENABLED:
+        debug_log(f"decrypt_key() called with encrypted key: {mask_sensitive(encrypted_key, 8)}")
     
     if not encrypted_key:
         debug_log("Empty encrypted key provided, returning empty string")
@@ -211,31 +344,54 @@ def decrypt_key(encrypted_key: str) -> str:
     
     try:
         debug_log("Step 1: Getting encryption key...")
-        key = get_encryption_key()
-        
+        return _decrypt_with_key(encrypted_key, get_encryption_key())
+    except Exception as e:
+        error_log(f"Unexpected error during decryption: {type(e).__name__}: {e}", e)
+        return ""
+
+@functools.lru_cache(maxsize=32)
+def _decrypt_with_key(encrypted_key: str, key: bytes) -> str:
+    """
+    Decrypts a non-empty base64 encoded API key with an already-derived AES key (see decrypt_key).
+    Also reads the older formats (see ENCRYPTION_VERSION_GCM_HKDF), which use the legacy key instead.
+    
+    The result depends only on (ciphertext, key), so it is memoized: the stored keys are decrypted
+    once and repeated loads of the same config skip the AES work. The AES key is part of the cache
+    key, so a new master key never returns a stale plaintext; invalidate_key_cache() also clears it.
+    """
+    try:
         debug_log("Step 2: Decoding base64...")
-        decoded_data = base64.b64decode(encrypted_key)
-        debug_log(f"Base64 decoded to {len(decoded_data)} bytes")
-        
-        debug_log("Step 3: Extracting IV and ciphertext...")
-        # The first 16 bytes are the IV, the rest is the ciphertext
-        iv = decoded_data[:16]
-        ct = decoded_data[16:]
-        debug_log(f"IV extracted: {len(iv)} bytes, Ciphertext: {len(ct)} bytes")
-        
-        debug_log("Step 4: Creating AES cipher with extracted IV...")
-        cipher = AES.new(key, AES.MODE_CBC, iv)
+        decoded_data = binascii.a2b_base64(encrypted_key)
+        debug_log("Base64 decoded to %s bytes", len(decoded_data))
         
-        debug_log("Step 5: Decrypting ciphertext...")
-        decrypted_padded = cipher.decrypt(ct)
-        debug_log(f"Decryption successful, padded plaintext length: {len(decrypted_padded)} bytes")
+        pt = None
+        version = decoded_data[:1]
+        if version in (ENCRYPTION_VERSION_GCM_HKDF, ENCRYPTION_VERSION_GCM) and len(decoded_data) > GCM_HEADER_LENGTH:
+            debug_log("Step 3: Decrypting and verifying GCM ciphertext...")
+            gcm_key = key if version == ENCRYPTION_VERSION_GCM_HKDF else get_legacy_encryption_key()
+            nonce = decoded_data[1:17]
+            tag = decoded_data[17:GCM_HEADER_LENGTH]
+            ct = decoded_data[GCM_HEADER_LENGTH:]
+            try:
+                pt = AES.new(gcm_key, AES.MODE_GCM, nonce=nonce).decrypt_and_verify(ct, tag)
+            except ValueError:
+                # A legacy CBC value whose random IV happens to start with the version byte
+                if len(decoded_data) % AES.block_size:
+                    raise
+                debug_log("GCM verification failed, retrying as legacy CBC value...")
         
-        debug_log("Step 6: Removing padding...")
-        pt = unpad(decrypted_padded, AES.block_size)
-        debug_log(f"Padding removed, final plaintext length: {len(pt)} bytes")
+        if pt is None:
+            debug_log("Step 3: Decrypting legacy CBC ciphertext...")
+            # The first 16 bytes are the IV, the rest is the ciphertext
+            iv = decoded_data[:16]
+            ct = decoded_data[16:]
+            cipher = AES.new(get_legacy_encryption_key(), AES.MODE_CBC, iv)
+            pt = unpad(cipher.decrypt(ct), AES.block_size)
+        debug_log("Decryption successful, plaintext length: %s bytes", len(pt))
         
         result = pt.decode('utf-8')
-        debug_log(f"Decryption successful, result: {mask_sensitive(result)}")
+        if DEBUG_ENABLED:
+            debug_log(f"Decryption successful, result: {mask_sensitive(result)}")
         
         return result
         
@@ -246,9 +402,43 @@ def decrypt_key(encrypted_key: str) -> str:
         error_log(f"Unexpected error during decryption: {type(e).__name__}: {e}", e)
         return ""
 
+def encrypt_keys(api_keys: dict) -> dict:
+    """
+    Encrypts several API keys at once, e.g. {"openai": "sk-...", "google": ""}.
+    The encryption key is read and derived once for the whole batch instead of per key.
+    Empty values stay empty; a key that fails to encrypt becomes "" (same as encrypt_key).
+    """
+    if not any(api_keys.values()):
+        return {name: "" for name in api_keys}
+    try:
+        key = get_encryption_key()
+    except Exception as e:
+        error_log(f"Exception during encryption: {type(e).__name__}: {e}", e)
+        return {name: "" for name in api_keys}
+    return {name: _encrypt_with_key(value, key) if value else "" for name, value in api_keys.items()}
+
+def decrypt_keys(encrypted_keys: dict) -> dict:
+    """
+    Decrypts several API keys at once with a single encryption key derivation.
+    Empty or undecryptable values become "" (same as decrypt_key).
+    """
+    if not any(encrypted_keys.values()):
+        return {name: "" for name in encrypted_keys}
+    try:
+        key = get_encryption_key()
+    except Exception as e:
+        error_log(f"Unexpected error during decryption: {type(e).__name__}: {e}", e)
+        return {name: "" for name in encrypted_keys}
+    return {name: _decrypt_with_key(value, key) if value else "" for name, value in encrypted_keys.items()}
+
 
 # --- Migration Helpers ---
 
+@functools.lru_cache(maxsize=1)
+def _get_old_encryption_key() -> bytes:
+    """Derived key for the old hardcoded secret; constant, so PBKDF2 runs at most once per process."""
+    return _pbkdf2(OLD_SECRET_KEY)
+
 def is_old_encryption(config: dict) -> bool:
     """
     Check if config uses old hardcoded key encryption.
@@ -256,6 +446,11 @@ def is_old_encryption(config: dict) -> bool:
     """
     debug_log("Checking if config uses old encryption system...")
     api_keys = config.get("api_keys", {})
+    if not any(api_keys.values()):
+        # Fresh install / no keys entered yet: nothing could be old-encrypted
+        debug_log("No stored API keys, nothing to check")
+        return False
+    old_key = None
     
     for key_name, encrypted_value in api_keys.items():
         if not encrypted_value:
@@ -263,9 +458,14 @@ def is_old_encryption(config: dict) -> bool:
             
         try:
             debug_log(f"Testing {key_name} with old encryption method...")
+            decoded = binascii.a2b_base64(encrypted_value)
+            # Old values are IV + whole AES blocks; anything else cannot be one, skip the AES work
+            if len(decoded) < 32 or len(decoded) % AES.block_size:
+                debug_log(f"Old encryption not detected for {key_name} (length mismatch)")
+                continue
             # Try decrypting with OLD hardcoded key
-            old_key = PBKDF2(OLD_SECRET_KEY, SALT, dkLen=32)
-            decoded = base64.b64decode(encrypted_value)
+            if old_key is None:
+                old_key = _get_old_encryption_key()
             iv = decoded[:16]
             ct = decoded[16:]
             cipher = AES.new(old_key, AES.MODE_CBC, iv)
@@ -290,7 +490,8 @@ def migrate_old_keys(config: dict) -> dict:
     print("[MIGRATION] Starting API key migration to machine-specific encryption...")
     print("=" * 60)
     
-    old_key = PBKDF2(OLD_SECRET_KEY, SALT, dkLen=32)
+    old_key = _get_old_encryption_key()
+    new_key = None  # fetched on the first key that needs re-encrypting, then reused
     api_keys = config.get("api_keys", {})
     migration_success = True
     
@@ -304,7 +505,7 @@ def migrate_old_keys(config: dict) -> dict:
             
             # Step 1: Decrypt with OLD hardcoded key
             debug_log(f"  Step 1: Decrypting with old key...")
-            decoded = base64.b64decode(encrypted_value)
+            decoded = binascii.a2b_base64(encrypted_value)
             iv = decoded[:16]
             ct = decoded[16:]
             cipher = AES.new(old_key, AES.MODE_CBC, iv)
@@ -313,7 +514,9 @@ def migrate_old_keys(config: dict) -> dict:
             
             # Step 2: Re-encrypt with NEW machine-specific key
             debug_log(f"  Step 2: Re-encrypting with new machine-specific key...")
-            new_encrypted = encrypt_key(plaintext)
+            if new_key is None:
+                new_key = get_encryption_key()
+            new_encrypted = _encrypt_with_key(plaintext, new_key) if plaintext else ""
             config["api_keys"][key_name] = new_encrypted
             
             print(f"[MIGRATION] ✓ Successfully migrated {key_name} API key")
@@ -353,7 +556,58 @@ def get_default_config():
         }
     }
 
+# Incremented on every save_config() so caches derived from the config
+# (e.g. provider model lists keyed by API key) can detect that they are stale.
+_config_generation = 0
+
+def get_config_generation() -> int:
+    """Returns a counter that changes whenever the configuration is saved or changes on disk."""
+    return _config_generation
+
+# (file signature, config) of the last parsed config.json; see load_config()
+_config_cache = None
+
+def _config_file_signature():
+    """Returns (mtime_ns, size) of the config file, or None if it doesn't exist."""
+    try:
+        stat_result = os.stat(CONFIG_FILE_PATH)
+    except OSError:
+        return None
+    return (stat_result.st_mtime_ns, stat_result.st_size)
+
+def get_config_etag():
+    """
+    Returns a weak HTTP ETag for the current config.json, derived from its mtime and size
+    (the same signature load_config() uses), or None if the file doesn't exist.
+    """
+    signature = _config_file_signature()
+    if signature is None:
+        return None
+    return f'W/"{signature[0]:x}-{signature[1]:x}"'
+
 def load_config() -> dict:
+    """
+    Returns the application configuration.
+
+    The parsed file is cached and revalidated with a single stat(): it is only re-read
+    when config.json's mtime or size changes (including edits made outside the app),
+    and save_config() drops the cache. Callers receive a deep copy, so mutating the
+    returned dict (e.g. to decrypt keys for a response) never leaks into the cache.
+    """
+    global _config_cache, _config_generation
+    signature = _config_file_signature()
+    cached = _config_cache
+    if cached is None or signature is None or cached[0] != signature:
+        if cached is not None:
+            # Changed on disk since it was cached: let derived caches refresh too
+            _config_generation += 1
+        config = _read_config_file()
+        # Re-stat: reading may have rewritten the file (creation, migrations)
+        cached = (_config_file_signature(), config)
+        _config_cache = cached
+    return copy.deepcopy(cached[1])
+
+def _read_config_file() -> dict:
     """
     Loads the configuration from the JSON file, creating it if it doesn't exist.
     Automatically performs one-time migration from old encryption to machine-specific encryption.
@@ -379,10 +633,14 @@ def load_config() -> dict:
     
     try:
         debug_log("Reading config file...")
-        with open(CONFIG_FILE_PATH, 'r') as f:
-            config = json.load(f)
+        with open(CONFIG_FILE_PATH, 'rb') as f:
+            config = orjson.loads(f.read())
         debug_log(f"Config file loaded successfully")
-        debug_log(f"Config keys: {list(config.keys())}")
+        if DEBUG_ENABLED:
+            debug_log(f"Config keys: {list(config.keys())}")
+        
+        # Migration steps below only mark the config dirty; it is written once after all of them ran
+        dirty = False
         
         # Check if migration from old encryption is needed
         debug_log("Checking migration status...")
@@ -392,13 +650,12 @@ def load_config() -> dict:
                 debug_log("Old encryption detected, performing migration...")
                 # Perform one-time migration
                 config = migrate_old_keys(config)
-                debug_log("Saving migrated config...")
-                save_config(config)
-                debug_log("Migration complete and saved")
+                dirty = True
+                debug_log("Migration complete")
             else:
                 debug_log("No old encryption detected, marking as migrated")
                 config["_migrated_to_machine_key"] = True
-                save_config(config)
+                dirty = True
         else:
             debug_log("Migration already completed (flag set)")
         
@@ -428,9 +685,8 @@ def load_config() -> dict:
             config["_migrated_to_file_key"] = True
             debug_log("Setting migration flag: _migrated_to_file_key = True")
             
-            # Save updated config
-            save_config(config)
-            debug_log("Migration flag saved, user needs to re-enter keys")
+            dirty = True
+            debug_log("Migration flag set, user needs to re-enter keys")
         elif config.get("_migrated_to_file_key", False):
             debug_log("Already migrated to file-based encryption")
             
@@ -444,6 +700,8 @@ def load_config() -> dict:
                 
                 # Proactively create the encryption key file
                 try:
+                    # Drop any key cached before the file went missing, then recreate the file
+                    invalidate_key_cache()
                     # Call get_or_create_master_key to trigger file creation
                     master_key = get_or_create_master_key()
                     debug_log(f"Encryption key file created successfully: {ENCRYPTION_KEY_FILE}")
@@ -458,7 +716,7 @@ def load_config() -> dict:
         else:
             debug_log("No migration flags set, treating as fresh install")
             config["_migrated_to_file_key"] = True
-            save_config(config)
+            dirty = True
             
             # STEP 2 NEW: Ensure encryption key file is created for fresh installs
             debug_log("Fresh install - ensuring encryption key file exists...")
@@ -468,6 +726,10 @@ def load_config() -> dict:
             except Exception as e:
                 error_log(f"Failed to create encryption key file on fresh install: {e}", e)
         
+        if dirty:
+            debug_log("Saving migrated config...")
+            save_config(config)
+        
         # Ensure all default keys exist in the loaded config
         debug_log("Merging with default config to ensure all keys exist...")
         default_config = get_default_config()
@@ -484,7 +746,7 @@ def load_config() -> dict:
         debug_log("=" * 60)
         return config
         
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         error_log(f"JSON decode error in config file: {e}", e)
         debug_log("Reverting to default settings due to JSON error")
         return get_default_config()
@@ -493,45 +755,54 @@ def load_config() -> dict:
         debug_log("Reverting to default settings due to error")
         return get_default_config()
 
+# Serializes save_config() calls (config updates run on the threadpool, so two can overlap)
+_config_write_lock = threading.Lock()
+
 def save_config(config: dict):
     """Saves the configuration dictionary to the JSON file."""
     debug_log("=" * 60)
     debug_log("save_config() called")
-    debug_log(f"Config keys to save: {list(config.keys())}")
     
-    # Log API key status (safely)
-    debug_log("API keys status:")
-    for key_name, encrypted_value in config.get("api_keys", {}).items():
-        if encrypted_value:
-            debug_log(f"  {key_name}: {mask_sensitive(encrypted_value, 8)}")
-        else:
-            debug_log(f"  {key_name}: <empty>")
+    # Log API key status (safely); skipped entirely, masking included, when debug logging is off
+    if DEBUG_ENABLED:
+        debug_log("Config keys to save: %s", list(config.keys()))
+        debug_log("API keys status:")
+        for key_name, encrypted_value in config.get("api_keys", {}).items():
+            if encrypted_value:
+                debug_log(f"  {key_name}: {mask_sensitive(encrypted_value, 8)}")
+            else:
+                debug_log("  %s: <empty>", key_name)
     
     try:
         debug_log("Ensuring data directory exists...")
         os.makedirs(APP_DATA_DIR, exist_ok=True)
         
-        debug_log(f"Writing config to: {CONFIG_FILE_PATH}")
-        with open(CONFIG_FILE_PATH, 'w') as f:
-            json.dump(config, f, indent=4)
-        
-        debug_log("Config file written successfully")
-        
-        # Verify the write
-        debug_log("Verifying write by reading back...")
-        with open(CONFIG_FILE_PATH, 'r') as f:
-            verification = json.load(f)
+        debug_log("Writing config to: %s", CONFIG_FILE_PATH)
+        # orjson serializes in native code straight to bytes (2-space indent, still human-editable)
+        # The payload is serialized up front and written in one call; it is not re-read to verify.
+        # It goes to a uniquely named temp file in the same directory that then replaces
+        # config.json (atomic rename), so a crash mid-write leaves either the old or the new
+        # config, never a truncated one; concurrent saves are serialized by _config_write_lock.
+        payload = orjson.dumps(config, option=orjson.OPT_INDENT_2)
+        global _config_cache, _config_generation
+        with _config_write_lock:
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(CONFIG_FILE_PATH), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(payload)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, CONFIG_FILE_PATH)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            
+            # Invalidate the cached configuration so the next load_config() sees this write
+            _config_cache = None
+            _config_generation += 1
         
-        # Check API keys were actually saved
-        for key_name in ["openai", "anthropic", "google"]:
-            saved_value = verification.get("api_keys", {}).get(key_name, "")
-            original_value = config.get("api_keys", {}).get(key_name, "")
-            if saved_value == original_value:
-                debug_log(f"Verification: {key_name} saved correctly")
-            else:
-                error_log(f"Verification FAILED: {key_name} mismatch!")
-                error_log(f"  Expected: {mask_sensitive(original_value, 8)}")
-                error_log(f"  Got: {mask_sensitive(saved_value, 8)}")
+        debug_log("Config file written successfully (%s bytes)", len(payload))
         
         debug_log("Save operation completed successfully")
         debug_log("=" * 60)
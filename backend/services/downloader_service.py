@@ -2,8 +2,15 @@ import yt_dlp
 import os
 
 def download_audio(url: str, save_path: str) -> str:
-    if not os.path.exists(save_path):
-        os.makedirs(save_path)
+    os.makedirs(save_path, exist_ok=True)
+
+    # yt-dlp reports the real output path (after the mp3 conversion) through this hook,
+    # so it does not have to be rebuilt from the template and probed on disk
+    final_paths = []
+
+    def record_final_path(d):
+        if d['status'] == 'finished':
+            final_paths.append(d['info_dict'].get('filepath'))
 
     ydl_opts = {
         'format': 'bestaudio/best',
@@ -14,20 +21,21 @@ def download_audio(url: str, save_path: str) -> str:
         }],
         'outtmpl': os.path.join(save_path, '%(title)s.%(ext)s'),
         'noplaylist': True,
+        'postprocessor_hooks': [record_final_path],
     }
 
     try:
         print(f"Starting download from URL: {url}")
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info_dict = ydl.extract_info(url, download=True)
-            base_filename = ydl.prepare_filename(info_dict).rsplit('.', 1)[0]
-            final_filepath = base_filename + '.mp3'
-            
-            if os.path.exists(final_filepath):
-                print(f"Download complete. File saved to: {final_filepath}")
-                return final_filepath
-            else:
-                raise Exception("Downloaded file not found after conversion.")
+            ydl.extract_info(url, download=True)
+
+        # The last postprocessor to finish holds the final location of the file
+        final_filepath = final_paths[-1] if final_paths else None
+        if final_filepath:
+            print(f"Download complete. File saved to: {final_filepath}")
+            return final_filepath
+        else:
+            raise Exception("Downloaded file not found after conversion.")
     except Exception as e:
         print(f"Error downloading from URL {url}: {e}")
         raise e
\ No newline at end of file
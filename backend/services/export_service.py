@@ -1,3 +1,6 @@
+import hashlib
+import threading
+from collections import OrderedDict
 from sqlalchemy.orm import Session
 from database.models import Transcription, Template
 from services.llm_service import generate_response
@@ -6,26 +9,22 @@ def _format_time(seconds: float) -> str:
     """A helper function to format seconds into a MM:SS string."""
     if seconds is None:
         return "00:00"
-    mins = int(seconds // 60)
-    secs = int(seconds % 60)
+    mins, secs = divmod(int(seconds), 60)
     return f"{mins:02d}:{secs:02d}"
 
-def format_transcript_md(transcription_result: dict) -> str:
+def format_transcript_md(transcription_result: dict):
     """
-    Formats a full transcription result from Whisper into a Markdown string.
+    Formats a full transcription result from Whisper as Markdown.
 
     Args:
         transcription_result: The full dictionary returned by the transcribe_audio service.
 
-    Returns:
-        A Markdown formatted string with timestamps for each segment.
+    Yields:
+        The header, then one timestamped Markdown line per segment.
     """
-    lines = [f"# Transcription\n"]
-    segments = transcription_result.get('segments', [])
-    for segment in segments:
-        start_time = _format_time(segment.get('start'))
-        lines.append(f"**[{start_time}]** {segment.get('text', '').strip()}")
-    return "\n".join(lines)
+    yield "# Transcription\n\n"
+    for segment in transcription_result.get('segments', []):
+        yield f"**[{_format_time(segment.get('start'))}]** {segment.get('text', '').strip()}\n"
 
 def format_transcript_txt(transcription_result: dict) -> str:
     """
@@ -39,6 +38,14 @@ def format_transcript_txt(transcription_result: dict) -> str:
     """
     return transcription_result.get('text', 'No text found.')
 
+# Markdown headers for content provided by the frontend, by content type
+CONTENT_HEADERS = {
+    'transcript': '# Transcription',
+    'summary': '# Summary',
+    'overview': '# Overview',
+    'report': '# Report'
+}
+
 def format_provided_content(content: str, content_type: str, as_markdown: bool) -> str:
     """
     Formats provided content (from frontend) with appropriate headers.
@@ -63,17 +70,35 @@ def format_provided_content(content: str, content_type: str, as_markdown: bool)
         return content
     
     # Markdown - add appropriate header based on type
-    headers = {
-        'transcript': '# Transcription',
-        'summary': '# Summary',
-        'overview': '# Overview',
-        'report': '# Report'
-    }
-    
-    header = headers.get(content_type, '# Document')
+    header = CONTENT_HEADERS.get(content_type, '# Document')
     return f"{header}\n\n{content}"
 
-def generate_and_format_summary(transcription: Transcription, model_key: str, as_markdown: bool) -> str:
+# Recently generated export texts, keyed by (model_key, SHA-256 of the prompt). Exporting the same
+# summary/overview/report again (e.g. as .txt after .md) reuses the text instead of re-running the
+# LLM over the whole transcript. Small LRU; error responses are never cached.
+GENERATION_CACHE_SIZE = 16
+_generation_cache = OrderedDict()
+_generation_cache_lock = threading.Lock()
+
+def _generate_cached(prompt: str, model_key: str) -> str:
+    """generate_response() with the LRU above in front of it."""
+    cache_key = (model_key, hashlib.sha256(prompt.encode("utf-8")).digest())
+    with _generation_cache_lock:
+        text = _generation_cache.get(cache_key)
+        if text is not None:
+            _generation_cache.move_to_end(cache_key)
+            return text
+    
+    text = generate_response(prompt, model_key=model_key)
+    if text and not text.startswith("Error:"):
+        with _generation_cache_lock:
+            _generation_cache[cache_key] = text
+            _generation_cache.move_to_end(cache_key)
+            while len(_generation_cache) > GENERATION_CACHE_SIZE:
+                _generation_cache.popitem(last=False)
+    return text
+
+def generate_and_format_summary(transcription: Transcription, model_key: str, as_markdown: bool) -> tuple:
     """
     Generates a bullet-point summary from a transcription and formats it.
 
@@ -83,15 +108,16 @@ def generate_and_format_summary(transcription: Transcription, model_key: str, as
         as_markdown: If True, formats the output as Markdown.
 
     Returns:
-        The formatted summary string.
+        The formatted summary as a tuple of string parts (header, body), to be written
+        out in order without concatenating them into one string.
     """
     prompt = f"Please provide a concise summary of the key points from the following text. Use bullet points for the main ideas.\n\n---\n\n{transcription.full_text}"
-    summary = generate_response(prompt, model_key=model_key)
+    summary = _generate_cached(prompt, model_key)
     if as_markdown:
-        return f"# Summary\n\n{summary}"
-    return summary
+        return ("# Summary\n\n", summary)
+    return (summary,)
 
-def generate_and_format_overview(transcription: Transcription, model_key: str, as_markdown: bool) -> str:
+def generate_and_format_overview(transcription: Transcription, model_key: str, as_markdown: bool) -> tuple:
     """
     Generates a narrative overview from a transcription and formats it.
 
@@ -101,15 +127,15 @@ def generate_and_format_overview(transcription: Transcription, model_key: str, a
         as_markdown: If True, formats the output as Markdown.
 
     Returns:
-        The formatted overview string.
+        The formatted overview as a tuple of string parts (see generate_and_format_summary).
     """
     prompt = f"Generate a narrative overview of the following text. Write it as a series of well-written paragraphs with concatenated ideas, suitable for a short audio briefing. Do not use bullet points or numbered lists.\n\n---\n\n{transcription.full_text}"
-    overview = generate_response(prompt, model_key=model_key)
+    overview = _generate_cached(prompt, model_key)
     if as_markdown:
-        return f"# Overview\n\n{overview}"
-    return overview
+        return ("# Overview\n\n", overview)
+    return (overview,)
 
-def generate_and_format_report(transcription: Transcription, template: Template, model_key: str, as_markdown: bool) -> str:
+def generate_and_format_report(transcription: Transcription, template: Template, model_key: str, as_markdown: bool) -> tuple:
     """
     Generates a custom report from a transcription and a template, then formats it.
 
@@ -120,15 +146,26 @@ def generate_and_format_report(transcription: Transcription, template: Template,
         as_markdown: If True, formats the output as Markdown.
 
     Returns:
-        The formatted report string.
+        The formatted report as a tuple of string parts (see generate_and_format_summary).
     """
     language_instruction = ""
     if template.language and template.language != "Does Not Apply":
         language_instruction = f"Please write the response in {template.language}.\n\n"
     
     full_prompt = f"{language_instruction}{template.prompt_text}\n\n---\n\n{transcription.full_text}"
-    report_text = generate_response(full_prompt, model_key=model_key)
+    report_text = _generate_cached(full_prompt, model_key)
     
     if as_markdown:
-        return f"# Report: {template.name}\n\n{report_text}"
-    return report_text
\ No newline at end of file
+        return (f"# Report: {template.name}\n\n", report_text)
+    return (report_text,)
+
+def iter_encoded_chunks(parts, chunk_size: int = 64 * 1024):
+    """
+    Yields UTF-8 encoded chunks of at most chunk_size characters from an iterable of string parts,
+    so a StreamingResponse can send large exports without building one big bytes object.
+    """
+    for part in parts:
+        # A failed LLM call can hand back None instead of text
+        part = part or ""
+        for start in range(0, len(part), chunk_size):
+            yield part[start:start + chunk_size].encode("utf-8")
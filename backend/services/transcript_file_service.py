@@ -0,0 +1,48 @@
+import os
+from services.config_service import load_config # Imports the function to load our app's configuration
+
+# Load the configuration to get the user-defined data storage path
+config = load_config()
+DATA_STORAGE_PATH = config.get("data_storage_path", ".")
+
+# Transcript texts are stored as plain UTF-8 files instead of inline in the SQLite row,
+# keeping the transcriptions table small so lookups touch as few pages as possible.
+TRANSCRIPTS_DIRECTORY = os.path.join(DATA_STORAGE_PATH, "transcripts")
+os.makedirs(TRANSCRIPTS_DIRECTORY, exist_ok=True)
+
+
+def get_transcript_path(source_id: int) -> str:
+    """Returns the file path used to store the transcript text of a source."""
+    return os.path.join(TRANSCRIPTS_DIRECTORY, f"{source_id}.txt")
+
+
+def save_transcript_text(source_id: int, text: str) -> str:
+    """
+    Writes a transcript's full text to disk.
+
+    Returns:
+        The path of the written file (stored in Transcription.full_text_path).
+    """
+    file_path = get_transcript_path(source_id)
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return file_path
+
+
+def read_transcript_text(file_path: str) -> str:
+    """Reads a transcript's full text from disk."""
+    with open(file_path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def iter_transcript_text(file_path: str, chunk_size: int = 64 * 1024):
+    """
+    Yields a transcript's text in chunks, so large transcripts can be streamed
+    without loading the whole file into memory.
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
@@ -1,7 +1,50 @@
-from gtts import gTTS
+import functools
+import importlib.util
+import io
 import os
+import wave
+from gtts import gTTS
+
+# Local Piper synthesis (no network round-trip) when a voice model is configured:
+# INSIGHTSLM_PIPER_VOICE points to the voice .onnx file (its .onnx.json config sits next to it).
+# Without it, or without the piper-tts package, audio is generated with gTTS as before.
+PIPER_VOICE_PATH = os.environ.get("INSIGHTSLM_PIPER_VOICE", "")
+PIPER_AVAILABLE = bool(PIPER_VOICE_PATH) and importlib.util.find_spec("piper") is not None
+
+@functools.lru_cache(maxsize=1)
+def _load_piper_voice():
+    """Loads the Piper voice once per process (CUDA execution provider when onnxruntime has it)."""
+    import onnxruntime
+    from piper import PiperVoice
+    use_cuda = "CUDAExecutionProvider" in onnxruntime.get_available_providers()
+    print(f"Loading Piper voice {PIPER_VOICE_PATH} ({'CUDA' if use_cuda else 'CPU'})...")
+    return PiperVoice.load(PIPER_VOICE_PATH, use_cuda=use_cuda)
+
+def _generate_audio_piper(text: str, save_path: str):
+    """Synthesizes text locally with Piper and encodes it to MP3 at save_path."""
+    import ffmpeg
+    voice = _load_piper_voice()
+
+    # Synthesize to an in-memory WAV, then let ffmpeg encode it (audio overviews are served as MP3)
+    wav_buffer = io.BytesIO()
+    with wave.open(wav_buffer, "wb") as wav_file:
+        voice.synthesize_wav(text, wav_file)
+    (
+        ffmpeg.input("pipe:", format="wav")
+        .output(save_path, format="mp3")
+        .run(input=wav_buffer.getvalue(), overwrite_output=True, quiet=True)
+    )
 
 def generate_audio(text: str, save_path: str) -> bool:
+    if PIPER_AVAILABLE:
+        try:
+            print(f"Generating audio locally with Piper at {save_path}...")
+            _generate_audio_piper(text, save_path)
+            print("Audio file generated successfully.")
+            return os.path.exists(save_path)
+        except Exception as e:
+            print(f"An error occurred during Piper generation, falling back to gTTS: {e}")
+
     try:
         print(f"Initializing gTTS to generate audio at {save_path}...")
         tts = gTTS(text=text, lang='en', slow=False)
@@ -10,4 +53,4 @@ def generate_audio(text: str, save_path: str) -> bool:
         return os.path.exists(save_path)
     except Exception as e:
         print(f"An error occurred during gTTS generation: {e}")
-        return False
\ No newline at end of file
+        return False
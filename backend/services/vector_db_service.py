@@ -1,7 +1,15 @@
+import functools
+import importlib.util
 import os
+import platform
+import queue
+import threading
 import chromadb
+import orjson
+import torch
 from sentence_transformers import SentenceTransformer
 import textwrap
+from concurrent.futures import ThreadPoolExecutor
 from services.config_service import load_config # Imports the function to load our app's configuration
 
 # Load the configuration to get the user-defined data storage path
@@ -11,6 +19,11 @@ DATA_STORAGE_PATH = config.get("data_storage_path", ".")
 # The ChromaDB vector database will now be stored inside the configured data storage path
 CHROMA_DB_PATH = os.path.join(DATA_STORAGE_PATH, "chroma_db")
 
+# Transcripts waiting to be embedded and written by the background ingest worker
+# (one {source_id}.jsonl file of segments each, deleted once the transcript is in ChromaDB)
+PENDING_INGEST_PATH = os.path.join(DATA_STORAGE_PATH, "chroma_pending")
+os.makedirs(PENDING_INGEST_PATH, exist_ok=True)
+
 # --- INITIALIZATION ---
 print("Initializing ChromaDB client...")
 # This creates a persistent client that saves data to the specified path
@@ -18,11 +31,116 @@ client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
 
 print("Loading Sentence Transformer model...")
 # Load a pre-trained model for creating embeddings. 'all-MiniLM-L6-v2' is a good, fast starting model.
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-print("Sentence Transformer model loaded.")
+# On CUDA the model runs in fp16 (and fp32 matmuls may use TF32): half the tensor-core work per batch.
+EMBEDDING_DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+if EMBEDDING_DEVICE == "cuda":
+    torch.set_float32_matmul_precision("high")
+# On CPU, the model's dynamically int8-quantized ONNX export (published with the model) runs on
+# ONNX Runtime when optimum/onnxruntime are installed: a faster encoder than fp32 PyTorch.
+# Set INSIGHTSLM_EMBEDDING_ONNX=0 to always use PyTorch.
+EMBEDDING_ONNX_FILE = (
+    "onnx/model_qint8_arm64.onnx" if platform.machine().lower() in ("arm64", "aarch64")
+    else "onnx/model_quint8_avx2.onnx"
+)
+USE_ONNX_EMBEDDINGS = (
+    EMBEDDING_DEVICE == "cpu"
+    and os.environ.get("INSIGHTSLM_EMBEDDING_ONNX", "1") != "0"
+    and importlib.util.find_spec("optimum") is not None
+    and importlib.util.find_spec("onnxruntime") is not None
+)
+
+def _load_embedding_model() -> SentenceTransformer:
+    if USE_ONNX_EMBEDDINGS:
+        try:
+            return SentenceTransformer(
+                'all-MiniLM-L6-v2', device="cpu", backend="onnx",
+                model_kwargs={"file_name": EMBEDDING_ONNX_FILE}
+            )
+        except Exception as e:
+            print(f"[WARNING] ONNX embedding model unavailable, using PyTorch: {e}")
+    model = SentenceTransformer('all-MiniLM-L6-v2', device=EMBEDDING_DEVICE)
+    if EMBEDDING_DEVICE == "cuda":
+        model.half()
+    return model
+
+embedding_model = _load_embedding_model()
+print(f"Sentence Transformer model loaded ({EMBEDDING_DEVICE}, {embedding_model.backend}).")
+
+# Chunks per encode() forward pass when ingesting a transcript
+EMBEDDING_BATCH_SIZE = 128
 
-# Get or create a collection in ChromaDB to store our transcripts
-collection = client.get_or_create_collection(name="transcripts")
+# The ChromaDB collection that stores our transcripts.
+# Embeddings are unit-length, so the collection indexes them by cosine distance with explicit HNSW
+# build/search parameters. The configuration can only be set when a collection is created, so an
+# existing collection built with the old default (L2) space is re-indexed into a cosine one once.
+COLLECTION_NAME = "transcripts"
+COLLECTION_CONFIGURATION = {
+    "hnsw": {
+        "space": "cosine",
+        "ef_construction": 200,
+        "max_neighbors": 16,
+        "ef_search": 64
+    }
+}
+# Collection being filled while an old one is re-indexed (renamed to COLLECTION_NAME when complete)
+_MIGRATION_COLLECTION_NAME = f"{COLLECTION_NAME}_cosine_migration"
+# Records copied per get()/add() round trip during the re-index
+_MIGRATION_PAGE_SIZE = 1000
+
+def _collection_space(existing) -> str:
+    """Distance space of an existing collection (configuration, else legacy metadata; default l2)."""
+    hnsw = (getattr(existing, "configuration", None) or {}).get("hnsw") or {}
+    return hnsw.get("space") or (existing.metadata or {}).get("hnsw:space", "l2")
+
+def _reindex_to_cosine(old_collection):
+    """
+    Copies every record of old_collection (stored embeddings included, nothing is re-encoded)
+    into a new cosine collection, then swaps it in under COLLECTION_NAME.
+    """
+    count = old_collection.count()
+    print(f"Re-indexing {count} vectors of '{COLLECTION_NAME}' into a cosine HNSW collection...")
+    # A leftover from an interrupted run is incomplete: start over
+    if _MIGRATION_COLLECTION_NAME in _collection_names():
+        client.delete_collection(_MIGRATION_COLLECTION_NAME)
+    new_collection = client.create_collection(
+        name=_MIGRATION_COLLECTION_NAME, configuration=COLLECTION_CONFIGURATION
+    )
+    for offset in range(0, count, _MIGRATION_PAGE_SIZE):
+        page = old_collection.get(
+            limit=_MIGRATION_PAGE_SIZE,
+            offset=offset,
+            include=["embeddings", "documents", "metadatas"]
+        )
+        if page["ids"]:
+            new_collection.add(
+                ids=page["ids"],
+                embeddings=page["embeddings"],
+                documents=page["documents"],
+                metadatas=page["metadatas"]
+            )
+    client.delete_collection(COLLECTION_NAME)
+    new_collection.modify(name=COLLECTION_NAME)
+    print("Re-index complete.")
+    return new_collection
+
+def _collection_names() -> set:
+    return {existing.name for existing in client.list_collections()}
+
+def _open_collection():
+    names = _collection_names()
+    if COLLECTION_NAME not in names:
+        if _MIGRATION_COLLECTION_NAME in names:
+            # Interrupted after the old collection was dropped: the copy is complete, finish the swap
+            migrated = client.get_collection(_MIGRATION_COLLECTION_NAME)
+            migrated.modify(name=COLLECTION_NAME)
+            return migrated
+        return client.create_collection(name=COLLECTION_NAME, configuration=COLLECTION_CONFIGURATION)
+    existing = client.get_collection(COLLECTION_NAME)
+    if _collection_space(existing) != "cosine":
+        return _reindex_to_cosine(existing)
+    return existing
+
+collection = _open_collection()
 print("ChromaDB collection 'transcripts' ready.")
 
 
@@ -51,31 +169,48 @@ def create_chunks_from_segments(segments: list, max_chunk_size: int = 1000):
     This is used for creating embeddings for vector search.
     """
     chunks = []
-    current_chunk_text = ""
+    # Segment texts of the current chunk (joined once when the chunk is finalized, instead of
+    # re-copying the growing string for every segment) and their joined length
+    current_chunk_parts = []
+    current_chunk_length = 0
     current_chunk_start_time = 0.0
+    last_index = len(segments) - 1
     
     for i, segment in enumerate(segments):
-        if not current_chunk_text:
+        if not current_chunk_parts:
             current_chunk_start_time = segment.get('start', 0.0)
 
-        # Add segment text to the current chunk
-        current_chunk_text += segment.get('text', '') + " "
+        # Add segment text to the current chunk (followed by a separating space)
+        text = segment.get('text', '')
+        current_chunk_parts.append(text)
+        current_chunk_length += len(text) + 1
 
         # If the chunk is large enough or it's the last segment, finalize the chunk
-        if len(current_chunk_text) >= max_chunk_size or i == len(segments) - 1:
+        if current_chunk_length >= max_chunk_size or i == last_index:
             chunks.append({
-                "text": current_chunk_text.strip(),
+                "text": " ".join(current_chunk_parts).strip(),
                 "start_time": current_chunk_start_time,
                 "end_time": segment.get('end', 0.0)
             })
             # Reset for the next chunk
-            current_chunk_text = ""
+            current_chunk_parts = []
+            current_chunk_length = 0
     
     return chunks
 
 
 # --- CORE FUNCTIONS ---
 
+@functools.lru_cache(maxsize=1024)
+def _embed_query(query_text: str):
+    """
+    Unit-length embedding of a query, cached: the same question asked again (or against
+    another source) skips the tokenizer and the encoder forward pass.
+    """
+    embedding = embedding_model.encode(query_text, normalize_embeddings=True, show_progress_bar=False)
+    embedding.flags.writeable = False  # Shared by every cache hit
+    return embedding
+
 def add_transcript_to_db(source_id: int, result: dict):
     """
     Chunks a transcript's segments, creates embeddings, and stores them with timestamps in ChromaDB.
@@ -88,33 +223,52 @@ def add_transcript_to_db(source_id: int, result: dict):
 
     # 1. Group segments into chunks with timestamps
     chunks = create_chunks_from_segments(segments)
-    text_chunks = [chunk['text'] for chunk in chunks]
 
-    # 2. Generate embeddings for each chunk
-    print(f"Generating embeddings for {len(text_chunks)} chunks...")
-    embeddings = embedding_model.encode(text_chunks).tolist()
+    # 2-5. Embed and store in batches, pipelined: while ChromaDB writes batch N on the writer
+    # thread, batch N+1 is being encoded here (at most one write in flight)
+    print(f"Generating embeddings for {len(chunks)} chunks...")
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="chroma-write") as writer:
+        pending_write = None
+        for batch_start in range(0, len(chunks), EMBEDDING_BATCH_SIZE):
+            batch = chunks[batch_start:batch_start + EMBEDDING_BATCH_SIZE]
+            text_chunks = [chunk['text'] for chunk in batch]
 
-    # 3. Create unique IDs for each chunk
-    chunk_ids = [f"{source_id}_{i}" for i in range(len(text_chunks))]
-    
-    # 4. Create metadata to store the original text, source_id, and timestamps
-    metadatas = [
-        {
-            "source_id": source_id,
-            "text": chunk['text'],
-            "start_time": chunk['start_time'],
-            "end_time": chunk['end_time']
-        } 
-        for chunk in chunks
-    ]
-
-    # 5. Add the data to the ChromaDB collection
-    collection.add(
-        ids=chunk_ids,
-        embeddings=embeddings,
-        documents=text_chunks,
-        metadatas=metadatas
-    )
+            # 2. Generate embeddings for the batch (unit-length, as the model already produces them);
+            # the float32 array goes to ChromaDB as is, without a Python list round-trip
+            embeddings = embedding_model.encode(
+                text_chunks,
+                batch_size=EMBEDDING_BATCH_SIZE,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )
+
+            # 3. Create unique IDs for each chunk
+            chunk_ids = [f"{source_id}_{i}" for i in range(batch_start, batch_start + len(batch))]
+
+            # 4. Create metadata to store the original text, source_id, and timestamps
+            metadatas = [
+                {
+                    "source_id": source_id,
+                    "text": chunk['text'],
+                    "start_time": chunk['start_time'],
+                    "end_time": chunk['end_time']
+                }
+                for chunk in batch
+            ]
+
+            # 5. Add the batch to the ChromaDB collection once the previous write has finished
+            if pending_write is not None:
+                pending_write.result()  # Re-raises a failed write
+            pending_write = writer.submit(
+                collection.add,
+                ids=chunk_ids,
+                embeddings=embeddings,
+                documents=text_chunks,
+                metadatas=metadatas
+            )
+        if pending_write is not None:
+            pending_write.result()
     print("Transcript with timestamps successfully added to vector DB.")
 
 def query_db(query_text: str, source_id: int, n_results: int = 3) -> list[dict]:
@@ -123,12 +277,15 @@ def query_db(query_text: str, source_id: int, n_results: int = 3) -> list[dict]:
     """
     print(f"Querying vector DB for source_id {source_id} with query: '{query_text}'")
     
+    # A transcript uploaded moments ago may still be in the ingest queue
+    wait_until_indexed(source_id)
+    
     # Generate an embedding for the user's query
-    query_embedding = embedding_model.encode(query_text).tolist()
+    query_embedding = _embed_query(query_text)
 
     # Query the collection, filtering by the specific source document
     results = collection.query(
-        query_embeddings=[query_embedding],
+        query_embeddings=query_embedding[None, :],
         n_results=n_results,
         where={"source_id": source_id}
     )
@@ -136,4 +293,123 @@ def query_db(query_text: str, source_id: int, n_results: int = 3) -> list[dict]:
     # Return the list of metadata dictionaries for the found chunks
     retrieved_metadatas = results['metadatas'][0] if results.get('metadatas') else []
     print(f"Found {len(retrieved_metadatas)} relevant chunks.")
-    return retrieved_metadatas
\ No newline at end of file
+    return retrieved_metadatas
+
+
+# --- BACKGROUND INGESTION ---
+# Uploads hand their transcript to a write-ahead queue instead of embedding it on the request path.
+# The segments are first written to PENDING_INGEST_PATH, so a transcript that was queued but not yet
+# stored (e.g. the server stopped) is ingested again on the next start.
+# query_db() waits for a source that is still queued, so a question asked right after the
+# upload already sees its chunks.
+
+_ingest_queue = queue.Queue()
+_ingest_thread = None
+# One ingestion at a time (the worker, or a query ingesting inline when no worker runs)
+_ingest_lock = threading.Lock()
+# source_id -> Event set once that source's queued transcript has been processed
+_pending_sources = {}
+
+# Longest a query waits for its source's queued transcript to be stored
+INGEST_WAIT_SECONDS = 120
+
+def _pending_ingest_file(source_id: int) -> str:
+    return os.path.join(PENDING_INGEST_PATH, f"{source_id}.jsonl")
+
+def _ingest_pending(source_id: int):
+    """Adds a queued transcript to the vector DB and removes its pending file on success."""
+    pending_file = _pending_ingest_file(source_id)
+    try:
+        with _ingest_lock:
+            # Already stored by another caller
+            if not os.path.exists(pending_file):
+                return
+            with open(pending_file, "rb") as f:
+                segments = [orjson.loads(line) for line in f if line.strip()]
+            add_transcript_to_db(source_id, {"segments": segments})
+            os.remove(pending_file)
+    except Exception as e:
+        # The pending file is kept and retried on the next start
+        print(f"[ERROR] Background ingestion failed for source_id {source_id}: {e}")
+    finally:
+        event = _pending_sources.pop(source_id, None)
+        if event is not None:
+            event.set()
+
+def _queue_source(source_id: int):
+    _pending_sources.setdefault(source_id, threading.Event())
+    _ingest_queue.put(source_id)
+
+def wait_until_indexed(source_id: int, timeout: float = INGEST_WAIT_SECONDS):
+    """
+    Blocks until a queued transcript of source_id has been processed (up to timeout seconds).
+    Without a running worker the transcript is ingested here instead.
+    """
+    event = _pending_sources.get(source_id)
+    if event is None:
+        return
+    if _ingest_thread is None:
+        _ingest_pending(source_id)
+        return
+    print(f"Waiting for source_id {source_id} to finish indexing...")
+    if not event.wait(timeout):
+        print(f"[WARNING] source_id {source_id} is still indexing; querying the chunks stored so far.")
+
+def _ingest_loop():
+    while True:
+        source_id = _ingest_queue.get()
+        if source_id is None:
+            return
+        _ingest_pending(source_id)
+
+def enqueue_transcript(source_id: int, result: dict):
+    """
+    Queues a transcript for add_transcript_to_db() on the background ingest worker and returns
+    immediately. The segments are written to a pending file first (durable queue entry).
+    """
+    segments = result.get('segments', [])
+    if not segments:
+        print("No segments found in transcription result.")
+        return
+
+    # Write then rename, so a pending file is never seen half-written
+    pending_file = _pending_ingest_file(source_id)
+    with open(pending_file + ".tmp", "wb") as f:
+        f.write(b"".join(orjson.dumps(segment) + b"\n" for segment in segments))
+    os.replace(pending_file + ".tmp", pending_file)
+    _queue_source(source_id)
+    print(f"Transcript for source_id {source_id} queued for the vector DB.")
+
+def start_ingest_worker():
+    """
+    Starts the background ingest worker (once per process) and queues any transcripts
+    left pending by a previous run.
+    """
+    global _ingest_thread
+    if _ingest_thread is not None:
+        return
+    _ingest_thread = threading.Thread(target=_ingest_loop, name="chroma-ingest", daemon=True)
+    _ingest_thread.start()
+    for entry in os.scandir(PENDING_INGEST_PATH):
+        name, ext = os.path.splitext(entry.name)
+        if ext == ".jsonl" and name.isdigit():
+            print(f"Resuming pending vector DB ingestion for source_id {name}.")
+            _queue_source(int(name))
+
+def stop_ingest_worker():
+    """
+    Stops the background ingest worker after the transcript in progress (waits up to 5 s).
+    Transcripts still queued keep their pending files and are resumed on the next start.
+    """
+    global _ingest_thread
+    if _ingest_thread is None:
+        return
+    # Drop queued work so the sentinel is seen next
+    try:
+        while True:
+            _ingest_queue.get_nowait()
+    except queue.Empty:
+        pass
+    _ingest_queue.put(None)
+    _ingest_thread.join(timeout=5)
+    _ingest_thread = None
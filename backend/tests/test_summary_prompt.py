@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+
+import main
+from schemas import SummarizeRequest
+
+
+class _FakeResult:
+    def __init__(self, row):
+        self._row = row
+
+    def scalars(self):
+        return self
+
+    def first(self):
+        return self._row
+
+
+class _FakeSession:
+    """Stands in for the read-only Session: every query returns the given transcription."""
+
+    def __init__(self, transcription):
+        self._transcription = transcription
+
+    def execute(self, statement, params=None):
+        return _FakeResult(self._transcription)
+
+
+def test_build_summary_prompt_contains_transcript():
+    transcription = SimpleNamespace(
+        full_text="The quarterly results exceeded expectations.",
+        detected_language="English"
+    )
+    request = SummarizeRequest(source_id=1, model_key="test-model")
+
+    prompt = main._build_summary_prompt(request, _FakeSession(transcription))
+
+    assert isinstance(prompt, str)
+    assert transcription.full_text in prompt
+    assert "Write your summary in English." in prompt